@@ -0,0 +1,98 @@
+"""
+Implements a minimal PDF writer, enough to draw text and ruled tables with the standard Helvetica fonts.
+It has no dependencies, so the synthetic journals can be generated wherever the pipeline runs.
+"""
+import zlib
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+
+
+def escape_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+class PageCanvas:
+    """
+    The drawing operations of a page, in PDF coordinates (points, from the bottom left corner).
+    """
+    fonts = {False: 'F1', True: 'F2'}
+
+    def __init__(self):
+        self.operations = ['0.5 w']
+
+    def text(self, x, y, text, size=9, bold=False):
+        self.operations.append(f'BT /{self.fonts[bold]} {size} Tf {x:.2f} {y:.2f} Td ({escape_text(text)}) Tj ET')
+
+    def line(self, x0, y0, x1, y1):
+        self.operations.append(f'{x0:.2f} {y0:.2f} m {x1:.2f} {y1:.2f} l S')
+
+    def to_bytes(self):
+        return '\n'.join(self.operations).encode('latin-1', errors='replace')
+
+
+class PdfWriter:
+    """
+    Class to write a PDF file page by page. Every page is written as soon as it is added, so the memory used does
+    not grow with the number of pages; the page tree, the catalog and the cross-reference table are written when
+    the writer is closed.
+    """
+    # object numbers: 1 catalog, 2 page tree, 3 and 4 fonts, then a page object and its content stream per page
+    first_page_object = 5
+
+    def __init__(self, path, compress=True):
+        """
+        Parameters
+        ----------
+        path: Path
+            The PDF file.
+        compress: bool, optional
+            If True, the content streams are compressed with Flate, like in the real journals. The default is True.
+        """
+        self.path = path
+        self.compress = compress
+        self.file = open(path, 'wb')
+        self.offsets = {}
+        self.n_pages = 0
+        self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._write_object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        self._write_object(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold '
+                              b'/Encoding /WinAnsiEncoding >>')
+
+    def add_page(self, canvas):
+        page_object = self.first_page_object + 2 * self.n_pages
+        content = canvas.to_bytes()
+        if self.compress:
+            content = zlib.compress(content)
+            stream_dictionary = f'<< /Length {len(content)} /Filter /FlateDecode >>'
+        else:
+            stream_dictionary = f'<< /Length {len(content)} >>'
+        self._write_object(page_object, (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_object + 1} 0 R >>'
+        ).encode('ascii'))
+        self._write_object(page_object + 1, stream_dictionary.encode('ascii') + b'\nstream\n' + content
+                           + b'\nendstream')
+        self.n_pages += 1
+
+    def close(self):
+        kids = ' '.join(f'{self.first_page_object + 2 * i} 0 R' for i in range(self.n_pages))
+        self._write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {self.n_pages} >>'.encode('ascii'))
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        xref_offset = self.file.tell()
+        n_objects = max(self.offsets) + 1
+        lines = [f'xref\n0 {n_objects}\n', '0000000000 65535 f \n']
+        lines.extend(f'{self.offsets[number]:010d} 00000 n \n' for number in range(1, n_objects))
+        lines.append(f'trailer\n<< /Size {n_objects} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n')
+        self.file.write(''.join(lines).encode('ascii'))
+        self.file.close()
+
+    def _write_object(self, number, body):
+        self.offsets[number] = self.file.tell()
+        self.file.write(f'{number} 0 obj\n'.encode('ascii') + body + b'\nendobj\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,329 @@
+"""
+Benchmark suite of the processing stages, run on a synthetic journal.
+
+Every stage runs in a fresh process, so its caches start cold and its peak memory (the maximum resident set size of
+the process) is not inflated by the previous stages. The setup of a stage (e.g. finding the page ranges of the
+categories) is not timed.
+
+Usage, from the root of the repository:
+    PYTHONPATH=src python -m benchmarks.run_benchmarks --applications 500 --table-rows 1000 --parts 2
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.synthetic_journal import SyntheticJournal
+from ipindia.cleaning.layout_tables import LayoutTableError, process_layout_data
+from ipindia.cleaning.tables import process_data
+from ipindia.date_processor import DateProcessor, extract_invention_records, is_contents_page
+from ipindia.document_session import DocumentSession
+from ipindia.page_store import read_pdf
+from ipindia.pdf_pages.contents_page import Contents
+from ipindia.pdf_sorter import PDFSorter
+
+
+def peak_rss_mb():
+    """
+    The peak resident set size of the current process, in MiB. ru_maxrss is in KiB on Linux and in bytes on macOS.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class Stopwatch:
+    """
+    Accumulates the wall and CPU time of the blocks run inside it, and the growth of the peak resident set size
+    from the start of the first block, so the setup of a stage is not measured.
+    """
+
+    def __init__(self):
+        self.seconds = 0
+        self.cpu_seconds = 0
+        self.baseline_rss_mb = None
+        self._start = None
+        self._cpu_start = None
+
+    def __enter__(self):
+        if self.baseline_rss_mb is None:
+            self.baseline_rss_mb = peak_rss_mb()
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.seconds += time.perf_counter() - self._start
+        self.cpu_seconds += time.process_time() - self._cpu_start
+
+
+def category_indices(processor, category):
+    """
+    The (pdf index, first page index, last page index, extraction start, extraction end) of every PDF containing
+    the category, as DateProcessor computes them.
+    """
+    result = []
+    for i in processor._gather_pdf_indices_in_category(category):
+        extraction_start, extraction_end = processor._compute_extraction_boundaries(
+            processor.boundary_pages_per_category[category], processor.boundary_pages_in_all_pdfs[i])
+        first_index, last_index = processor.page_indices[i].index_range(extraction_start, extraction_end)
+        result.append((i, first_index, last_index, extraction_start, extraction_end))
+    return result
+
+
+def table_category_indices(date_directory, work_directory):
+    """
+    The (pdf index, first page index, last page index, pdf path) of every PDF containing each table category,
+    with the page indices DateProcessor gives to the table engines.
+    """
+    processor = DateProcessor(date_directory, output_directory=work_directory / date_directory.name)
+    result = []
+    for category in processor.table_categories:
+        indices = []
+        for i, _, _, extraction_start, extraction_end in category_indices(processor, category):
+            page_index = processor.page_indices[i]
+            indices.append((i, processor.get_first_index(page_index, extraction_start),
+                            processor.get_last_index(page_index, extraction_end), processor.pdfs_paths[i]))
+        result.append((category, category == processor.table_categories[1], indices))
+    processor.close()
+    return result
+
+
+# ------------------------------
+# Stages
+# Every stage takes the date directory, a scratch directory and the Stopwatch that times its measured part, and
+# returns the number of pages and records processed and the number of bytes read.
+# ------------------------------
+
+def text_extraction(date_directory, work_directory, stopwatch):
+    pdf_paths = PDFSorter(date_directory / 'pdf').sort_pdf_files()
+    with stopwatch:
+        n_pages = sum(1 for path in pdf_paths for _ in read_pdf(path))
+    return n_pages, n_pages, sum(path.stat().st_size for path in pdf_paths)
+
+
+def pdf_sorting(date_directory, work_directory, stopwatch):
+    with stopwatch:
+        pdf_paths = PDFSorter(date_directory / 'pdf').sort_pdf_files()
+    return 0, len(pdf_paths), 0
+
+
+def contents_parsing(date_directory, work_directory, stopwatch):
+    pdf_path = PDFSorter(date_directory / 'pdf').sort_pdf_files()[0]
+    with DocumentSession(pdf_path) as session:
+        contents_index = next(i for i, page in enumerate(session.text) if is_contents_page(page))
+        with stopwatch:
+            limits = Contents(pdf_path, contents_index, session=session).get_limits()
+    return 1, len(limits), 0
+
+
+def invention_parsing(date_directory, work_directory, stopwatch):
+    processor = DateProcessor(date_directory, output_directory=work_directory / date_directory.name)
+    n_pages = n_records = n_bytes = 0
+    for category in processor.invention_categories:
+        for i, first_index, last_index, extraction_start, extraction_end in category_indices(processor, category):
+            pages = processor.sessions[i].text
+            n_pages += last_index - first_index
+            n_bytes += sum(len(pages[index].encode('utf-8')) for index in range(first_index, last_index))
+            with stopwatch:
+                applications, _, _ = extract_invention_records(pages, range(first_index, last_index),
+                                                               extraction_start, extraction_end)
+            n_records += len(applications)
+    processor.close()
+    return n_pages, n_records, n_bytes
+
+
+def table_extraction(date_directory, work_directory, stopwatch):
+    n_pages = n_records = n_bytes = 0
+    for _, correct_serial_number, indices in table_category_indices(date_directory, work_directory):
+        for _, first_index, last_index, pdf_path in indices:
+            with stopwatch, DocumentSession(pdf_path) as session:
+                df = process_data(pdf_path, first_index, last_index, correct_serial_number, session)
+            n_pages += last_index - first_index
+            n_records += len(df)
+            n_bytes += pdf_path.stat().st_size
+    return n_pages, n_records, n_bytes
+
+
+def layout_table_extraction(date_directory, work_directory, stopwatch):
+    n_pages = n_records = n_bytes = 0
+    for _, correct_serial_number, indices in table_category_indices(date_directory, work_directory):
+        for _, first_index, last_index, pdf_path in indices:
+            with stopwatch:
+                try:
+                    df = process_layout_data(read_pdf(pdf_path, physical=True), first_index, last_index,
+                                             correct_serial_number)
+                except LayoutTableError as error:
+                    # as in DateProcessor, the pages the layout engine cannot split are extracted with pdfplumber
+                    print(f'Layout engine failed ({error}), falling back to pdfplumber')
+                    with DocumentSession(pdf_path) as session:
+                        df = process_data(pdf_path, first_index, last_index, correct_serial_number, session)
+            n_pages += last_index - first_index
+            n_records += len(df)
+            n_bytes += pdf_path.stat().st_size
+    return n_pages, n_records, n_bytes
+
+
+def export(date_directory, work_directory, stopwatch, output_format):
+    """
+    The whole processing of the date, from the PDF files to the output files, without the page text store.
+    """
+    output_directory = work_directory / output_format / date_directory.name
+    output_directory.mkdir(parents=True, exist_ok=True)
+    n_bytes = sum(path.stat().st_size for path in (date_directory / 'pdf').glob('*.pdf'))
+    with stopwatch:
+        processor = DateProcessor(date_directory, use_page_store=False, output_format=output_format,
+                                  output_directory=output_directory,
+                                  parquet_directory=work_directory / output_format / 'parquet',
+                                  sqlite_path=work_directory / output_format / 'ipindia.sqlite')
+        processor.export_data()
+    n_pages = sum(len(page_index) for page_index in processor.page_indices)
+    return n_pages, None, n_bytes
+
+
+def export_csv(date_directory, work_directory, stopwatch):
+    return export(date_directory, work_directory, stopwatch, 'csv')
+
+
+def export_parquet(date_directory, work_directory, stopwatch):
+    return export(date_directory, work_directory, stopwatch, 'parquet')
+
+
+def export_sqlite(date_directory, work_directory, stopwatch):
+    return export(date_directory, work_directory, stopwatch, 'sqlite')
+
+
+STAGES = {
+    'text extraction': text_extraction,
+    'pdf sorting': pdf_sorting,
+    'contents parsing': contents_parsing,
+    'invention parsing': invention_parsing,
+    'table extraction': table_extraction,
+    'table extraction (layout)': layout_table_extraction,
+    'export (csv)': export_csv,
+    'export (parquet)': export_parquet,
+    'export (sqlite)': export_sqlite,
+}
+
+
+def run_stage(name, date_directory, work_directory):
+    """
+    Runs a stage inside a worker process and returns its measurements.
+    """
+    stopwatch = Stopwatch()
+    n_pages, n_records, n_bytes = STAGES[name](date_directory, work_directory, stopwatch)
+    return {'seconds': stopwatch.seconds, 'cpu_seconds': stopwatch.cpu_seconds, 'pages': n_pages,
+            'records': n_records, 'bytes': n_bytes, 'peak_rss_mb': peak_rss_mb(),
+            'baseline_rss_mb': stopwatch.baseline_rss_mb}
+
+
+class BenchmarkSuite:
+    """
+    Class to generate a synthetic journal and time the processing stages on it.
+    """
+
+    def __init__(self, journal, stages=None, repeat=3, work_directory=None):
+        """
+        Parameters
+        ----------
+        journal: SyntheticJournal
+            The journal the stages are run on.
+        stages: list of str, optional
+            The stages to run, among the keys of STAGES. The default is all of them.
+        repeat: int, optional
+            The number of runs of every stage. The reported times are the median of the runs. The default is 3.
+        work_directory: Path, optional
+            The directory where the journal and the outputs are written. The default is a temporary directory,
+            deleted at the end.
+        """
+        self.journal = journal
+        self.stages = stages or list(STAGES)
+        unknown_stages = set(self.stages) - set(STAGES)
+        if unknown_stages:
+            raise ValueError(f'Unknown stages: {", ".join(sorted(unknown_stages))}')
+        self.repeat = repeat
+        self.work_directory = work_directory
+
+    def run(self):
+        """
+        Main method. Returns the measurements of every stage, by stage name.
+        """
+        if self.work_directory is not None:
+            return self._run_in(Path(self.work_directory))
+        with tempfile.TemporaryDirectory() as work_directory:
+            return self._run_in(Path(work_directory))
+
+    def _run_in(self, work_directory):
+        date_directory = self.journal.write(work_directory / 'journals')
+        print(f'{date_directory}: {self.journal.n_pages} pages')
+        results = {}
+        context = multiprocessing.get_context('spawn')
+        for name in self.stages:
+            runs = []
+            for i in range(self.repeat):
+                output_directory = work_directory / 'outputs' / f'{name}-{i}'.replace(' ', '_')
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    runs.append(executor.submit(run_stage, name, date_directory, output_directory).result())
+                shutil.rmtree(output_directory, ignore_errors=True)
+            results[name] = self._summarize(runs)
+            print(self.format_row(name, results[name]))
+        return results
+
+    @staticmethod
+    def _summarize(runs):
+        seconds = statistics.median(run['seconds'] for run in runs)
+        summary = {
+            'seconds': seconds,
+            'cpu_seconds': statistics.median(run['cpu_seconds'] for run in runs),
+            'pages': runs[0]['pages'],
+            'records': runs[0]['records'],
+            'bytes': runs[0]['bytes'],
+            'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+            'stage_rss_mb': max(run['peak_rss_mb'] - run['baseline_rss_mb'] for run in runs),
+        }
+        summary['pages_per_second'] = summary['pages'] / seconds if seconds and summary['pages'] else None
+        summary['records_per_second'] = summary['records'] / seconds if seconds and summary['records'] else None
+        return summary
+
+    @staticmethod
+    def format_row(name, result):
+        def rate(value):
+            return f'{value:10.1f}' if value is not None else f'{"-":>10}'
+
+        records = result['records'] if result['records'] is not None else '-'
+        return (f'{name:<26} {result["seconds"]:8.3f} s {result["pages"]:6} pages {rate(result["pages_per_second"])}'
+                f' pages/s {records:>7} records {rate(result["records_per_second"])} records/s '
+                f'peak {result["peak_rss_mb"]:7.1f} MiB (+{result["stage_rss_mb"]:.1f} MiB in the stage)')
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Times the processing stages on a synthetic journal.')
+    parser.add_argument('--applications', type=int, default=200,
+                        help='applications of each invention category (one page each)')
+    parser.add_argument('--table-rows', type=int, default=400, help='rows of each table category')
+    parser.add_argument('--parts', type=int, default=1, help='number of PDF files of the journal')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every stage; the median time is reported')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), metavar='STAGE',
+                        help=f'stages to run, among: {", ".join(STAGES)}')
+    parser.add_argument('--work-directory', type=Path,
+                        help='where the journal and the outputs are kept (the default is a temporary directory)')
+    parser.add_argument('--json', type=Path, help='file where the results are written as JSON')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    synthetic_journal = SyntheticJournal(n_early=arguments.applications, n_after_18_months=arguments.applications,
+                                         n_fer=arguments.table_rows, n_grants=arguments.table_rows,
+                                         parts=arguments.parts, seed=arguments.seed)
+    suite = BenchmarkSuite(synthetic_journal, arguments.stages, arguments.repeat, arguments.work_directory)
+    benchmark_results = suite.run()
+    if arguments.json is not None:
+        arguments.json.write_text(json.dumps(benchmark_results, indent=2))
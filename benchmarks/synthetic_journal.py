@@ -0,0 +1,324 @@
+"""
+Implements the SyntheticJournal class, which generates Patent Office Journals of configurable size with the
+structure the pipeline expects: a CONTENTS page with the page ranges of the categories, invention pages with the
+(NN) fields and the page number in the footer, and the ruled tables of the FER and 43(2) grant sections.
+"""
+import random
+import textwrap
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks.pdf_writer import PAGE_HEIGHT, PAGE_WIDTH, PageCanvas, PdfWriter
+
+MARGIN = 36
+LINE_HEIGHT = 11
+ROW_HEIGHT = 15
+
+OFFICES = [('DELHI', 11), ('MUMBAI', 21), ('CHENNAI', 41), ('KOLKATA', 31)]
+FIRST_NAMES = ['RAHUL', 'PRIYA', 'ANIL', 'SUNITA', 'VIKRAM', 'MEERA', 'ARJUN', 'KAVITA', 'SANJAY', 'DEEPA']
+LAST_NAMES = ['SHARMA', 'IYER', 'PATEL', 'REDDY', 'GUPTA', 'NAIR', 'SINGH', 'DAS', 'RAO', 'MEHTA']
+ORGANIZATIONS = ['INDIAN INSTITUTE OF TECHNOLOGY', 'NATIONAL CHEMICAL LABORATORY', 'BHARAT ELECTRONICS LIMITED',
+                 'UNIVERSITY OF PUNE', 'TATA STEEL LIMITED', 'INFOSYS LIMITED']
+CITIES = [('NEW DELHI', 'Delhi', '110016'), ('MUMBAI', 'Maharashtra', '400076'), ('CHENNAI', 'Tamil Nadu', '600036'),
+          ('KOLKATA', 'West Bengal', '700032'), ('PUNE', 'Maharashtra', '411008'), ('BENGALURU', 'Karnataka', '560012')]
+STREETS = ['MG ROAD', 'HAUZ KHAS', 'POWAI', 'SARDAR PATEL ROAD', 'JADAVPUR', 'PASHAN ROAD']
+TITLE_WORDS = ['SYSTEM', 'METHOD', 'APPARATUS', 'COMPOSITION', 'PROCESS', 'DEVICE', 'SENSOR', 'POLYMER',
+               'CATALYST', 'NETWORK', 'BATTERY', 'VACCINE', 'ALLOY', 'ENGINE', 'MONITORING', 'SYNTHESIS']
+ABSTRACT_WORDS = ['the', 'present', 'invention', 'relates', 'to', 'a', 'method', 'for', 'producing', 'an',
+                  'improved', 'composition', 'comprising', 'layer', 'wherein', 'said', 'unit', 'is', 'configured',
+                  'signal', 'temperature', 'control', 'module', 'data', 'efficiency', 'reduced', 'cost', 'and']
+CLASSIFICATIONS = ['A61K 36/00', 'A61P 35/00', 'G06F 16/00', 'H04L 29/06', 'C08L 23/00', 'H01M 10/05',
+                   'B01J 23/00', 'G01N 33/00', 'F02B 75/00', 'C22C 38/00']
+
+FER_COLUMNS = [('Sr. No.', 40), ('Application Number', 110), ('Date of Filing', 80),
+               ('Email (As Per Record)', 180), ('Email Updated Online', 113)]
+GRANT_COLUMNS = [('S.No', 35), ('Patent Number', 70), ('Application Number', 95), ('Date of Filing', 70),
+                 ('Title of Invention', 253)]
+
+
+class SyntheticJournal:
+    """
+    Class to generate a synthetic journal for a date, in the directory layout of the downloads
+    (<root>/<year>/<date>/pdf/Part I.pdf, ...). The content is random but reproducible for a given seed.
+    """
+    categories = ['EARLY PUBLICATION',
+                  'PUBLICATION AFTER 18 MONTHS',
+                  'WEEKLY ISSUED FER',
+                  'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT']
+    roman_numbers = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
+
+    def __init__(self, journal_date='2023-01-06', n_early=100, n_after_18_months=100, n_fer=200, n_grants=200,
+                 parts=1, rows_per_page=40, seed=0):
+        """
+        Parameters
+        ----------
+        journal_date: str, optional
+            The date of the journal, formatted as YYYY-MM-DD. The default is '2023-01-06'.
+        n_early: int, optional
+            The number of applications (one page each) of the EARLY PUBLICATION category. The default is 100.
+        n_after_18_months: int, optional
+            The number of applications of the PUBLICATION AFTER 18 MONTHS category. The default is 100.
+        n_fer: int, optional
+            The number of rows of the WEEKLY ISSUED FER table. The default is 200.
+        n_grants: int, optional
+            The number of rows of the 43(2) grant table. The default is 200.
+        parts: int, optional
+            The number of PDF files the journal is split into. The default is 1.
+        rows_per_page: int, optional
+            The number of table rows per page. The default is 40.
+        seed: int, optional
+            The seed of the random content. The default is 0.
+        """
+        if not 1 <= parts <= len(self.roman_numbers):
+            raise ValueError(f'The number of parts must be between 1 and {len(self.roman_numbers)}')
+        self.journal_date = date.fromisoformat(journal_date)
+        self.n_early = n_early
+        self.n_after_18_months = n_after_18_months
+        self.n_fer = n_fer
+        self.n_grants = n_grants
+        self.parts = parts
+        self.rows_per_page = rows_per_page
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.header = (f'The Patent Office Journal No. {self.journal_date.isocalendar()[1]:02d}/'
+                       f'{self.journal_date.year} Dated {self.journal_date:%d/%m/%Y}')
+        self.serial = 0
+
+    @property
+    def n_pages(self):
+        return 2 + self.n_early + self.n_after_18_months + self._n_table_pages(self.n_fer) \
+            + self._n_table_pages(self.n_grants)
+
+    def write(self, root):
+        """
+        Main method. Writes the PDF files of the journal.
+
+        Parameters
+        ----------
+        root: str or Path
+            The directory of the year directories.
+
+        Returns
+        -------
+        Path
+            The directory of the date, containing the pdf directory.
+        """
+        date_directory = Path(root) / str(self.journal_date.year) / self.journal_date.isoformat()
+        pdf_directory = date_directory / 'pdf'
+        pdf_directory.mkdir(parents=True, exist_ok=True)
+        self.random.seed(self.seed)
+        self.serial = 0
+        pages_per_part = -(-self.n_pages // self.parts)
+        writer = None
+        for page_index, canvas in enumerate(self.iter_pages()):
+            if page_index % pages_per_part == 0:
+                if writer is not None:
+                    writer.close()
+                part_number = self.roman_numbers[page_index // pages_per_part]
+                writer = PdfWriter(pdf_directory / f'Part {part_number}.pdf')
+            writer.add_page(canvas)
+        writer.close()
+        return date_directory
+
+    def iter_pages(self):
+        """
+        Yields the canvases of the pages, in order, with page numbers starting at 1.
+        """
+        yield self._contents_page()
+        yield self._introduction_page()
+        page_number = 3
+        for category, n_applications in ((self.categories[0], self.n_early),
+                                          (self.categories[1], self.n_after_18_months)):
+            for office, office_code in self._offices_with_applications(n_applications):
+                for _ in range(office[1]):
+                    yield self._invention_page(page_number, category, office_code)
+                    page_number += 1
+        for category, columns, n_rows in ((self.categories[2], FER_COLUMNS, self.n_fer),
+                                          (self.categories[3], GRANT_COLUMNS, self.n_grants)):
+            row_builder = self._fer_row if columns is FER_COLUMNS else self._grant_row
+            rows = (row_builder(i + 1) for i in range(n_rows))
+            for page_offset in range(self._n_table_pages(n_rows)):
+                page_rows = [next(rows) for _ in range(min(self.rows_per_page, n_rows))]
+                n_rows -= len(page_rows)
+                title = category if page_offset == 0 else None
+                yield self._table_page(page_number, title, columns, page_rows)
+                page_number += 1
+
+    # ------------------------------
+    # Contents
+    # ------------------------------
+
+    def page_ranges(self):
+        """
+        The rows of the contents table: the subject and its page range, with a row per office for the invention
+        categories, as in the real journals.
+        """
+        rows = [('INTRODUCTION', '2')]
+        first_page = 3
+        for category, n_applications in ((self.categories[0], self.n_early),
+                                          (self.categories[1], self.n_after_18_months)):
+            for (office, n_office_applications), _ in self._offices_with_applications(n_applications):
+                last_page = first_page + n_office_applications - 1
+                rows.append((f'{category} ({office})', f'{first_page} - {last_page}'))
+                first_page = last_page + 1
+        for category, n_rows in ((self.categories[2], self.n_fer), (self.categories[3], self.n_grants)):
+            n_table_pages = self._n_table_pages(n_rows)
+            if n_table_pages:
+                last_page = first_page + n_table_pages - 1
+                rows.append((category, f'{first_page} - {last_page}'))
+                first_page = last_page + 1
+        return rows
+
+    def _contents_page(self):
+        canvas = self._new_page(1)
+        canvas.text(MARGIN, 780, 'CONTENTS', size=12, bold=True)
+        rows = [(subject, ':', page_range) for subject, page_range in self.page_ranges()]
+        self._draw_table(canvas, 760, [('SUBJECT', 380), ('', 23), ('PAGE NUMBER', 120)], rows)
+        return canvas
+
+    def _introduction_page(self):
+        canvas = self._new_page(2)
+        canvas.text(MARGIN, 780, 'INTRODUCTION', size=12, bold=True)
+        paragraph = ' '.join(self.random.choice(ABSTRACT_WORDS) for _ in range(400))
+        self._draw_lines(canvas, 760, textwrap.wrap(paragraph, 100))
+        return canvas
+
+    # ------------------------------
+    # Invention pages
+    # ------------------------------
+
+    def _invention_page(self, page_number, category, office_code):
+        self.serial += 1
+        application_no = f'{self.journal_date.year}{office_code}{self.serial:06d}'
+        delay = 18 * 30 if category == self.categories[1] else 0
+        filing_date = self.journal_date - timedelta(days=delay + self.random.randint(3, 120))
+        title = ' '.join(self.random.choice(TITLE_WORDS) for _ in range(self.random.randint(4, 14)))
+        classifications = ', '.join(self.random.sample(CLASSIFICATIONS, self.random.randint(1, 4)))
+        if self.random.random() < 0.3:
+            international = [f':PCT/IN{filing_date.year}/{self.random.randint(50000, 59999)}',
+                             f':{filing_date - timedelta(days=365):%d/%m/%Y}']
+            publication = f'WO {filing_date.year}/{self.random.randint(100000, 199999)}'
+        else:
+            international = [':NA', ':NA']
+            publication = 'NA'
+        lines = ['(12) PATENT APPLICATION PUBLICATION',
+                 '(19) INDIA',
+                 f'(21) Application No.{application_no} A',
+                 f'(22) Date of filing of Application :{filing_date:%d/%m/%Y}',
+                 f'(43) Publication Date : {self.journal_date:%d/%m/%Y}']
+        lines.extend(textwrap.wrap(f'(54) Title of the invention : {title}', 95))
+        lines.extend(['(51) International', f'classification :{classifications}',
+                      '(86) International', 'Application No', 'Filing Date', *international,
+                      '(87) International', f'Publication No : {publication}',
+                      '(61) Patent of Addition', 'to Application Number', 'Filing Date', ':NA', ':NA',
+                      '(62) Divisional to', 'Application Number', 'Filing Date', ':NA', ':NA',
+                      '(71)Name of Applicant :'])
+        lines.extend(self._people_lines(self.random.randint(1, 3), organizations=True))
+        lines.append('Name of Applicant : NA')
+        lines.append('Address of Applicant : NA')
+        lines.append('(72)Name of Inventor :')
+        lines.extend(self._people_lines(self.random.randint(1, 4), organizations=False))
+        lines.append('(57) Abstract :')
+        abstract = ' '.join(self.random.choice(ABSTRACT_WORDS) for _ in range(self.random.randint(60, 160)))
+        lines.extend(textwrap.wrap(abstract.capitalize() + '.', 95))
+        lines.append(f'No. of Pages : {self.random.randint(10, 60)} No. of Claims : {self.random.randint(5, 30)}')
+        canvas = self._new_page(page_number)
+        self._draw_lines(canvas, 790, lines)
+        return canvas
+
+    def _people_lines(self, n_people, organizations):
+        lines = []
+        for i in range(n_people):
+            if organizations and i == 0:
+                name = self.random.choice(ORGANIZATIONS)
+            else:
+                name = f'{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}'
+            city, state, pincode = self.random.choice(CITIES)
+            address = f'{self.random.randint(1, 99)}, {self.random.choice(STREETS)}, {city}, {state} {pincode}'
+            lines.append(f'{i + 1}){name}')
+            lines.append(f'Address of Applicant :{address} ----------- -----------')
+        return lines
+
+    # ------------------------------
+    # Table pages
+    # ------------------------------
+
+    def _fer_row(self, serial_number):
+        application_no = f'{self.journal_date.year - 2}{self.random.choice(OFFICES)[1]}' \
+                         f'{self.random.randint(0, 999999):06d}'
+        filing_date = self.journal_date - timedelta(days=self.random.randint(400, 1500))
+        email = f'patents{self.random.randint(1, 999)}@example.com'
+        return (str(serial_number), application_no, f'{filing_date:%d/%m/%Y}', email,
+                self.random.choice(['Yes', 'No']))
+
+    def _grant_row(self, serial_number):
+        application_no = f'{self.journal_date.year - 4}{self.random.choice(OFFICES)[1]}' \
+                         f'{self.random.randint(0, 999999):06d}'
+        filing_date = self.journal_date - timedelta(days=self.random.randint(1000, 3000))
+        title = ' '.join(self.random.choice(TITLE_WORDS) for _ in range(self.random.randint(2, 5)))
+        return (str(serial_number), str(self.random.randint(400000, 499999)), application_no,
+                f'{filing_date:%d/%m/%Y}', title)
+
+    def _table_page(self, page_number, title, columns, rows):
+        canvas = self._new_page(page_number)
+        if title is not None:
+            canvas.text(MARGIN, 790, title, size=11, bold=True)
+        self._draw_table(canvas, 750, columns, rows)
+        return canvas
+
+    def _n_table_pages(self, n_rows):
+        return -(-n_rows // self.rows_per_page)
+
+    # ------------------------------
+    # Drawing
+    # ------------------------------
+
+    def _new_page(self, page_number):
+        canvas = PageCanvas()
+        canvas.text(MARGIN, PAGE_HEIGHT - 24, self.header, size=8)
+        canvas.text(PAGE_WIDTH / 2, 24, str(page_number), size=9)
+        return canvas
+
+    @staticmethod
+    def _draw_lines(canvas, top, lines):
+        for i, line in enumerate(lines):
+            canvas.text(MARGIN, top - i * LINE_HEIGHT, line)
+
+    @staticmethod
+    def _draw_table(canvas, top, columns, rows):
+        """
+        Draws a ruled table, with the header row in bold and a line around every cell.
+        """
+        x_positions = [MARGIN]
+        for _, width in columns:
+            x_positions.append(x_positions[-1] + width)
+        n_lines = len(rows) + 1
+        bottom = top - n_lines * ROW_HEIGHT
+        for i in range(n_lines + 1):
+            y = top - i * ROW_HEIGHT
+            canvas.line(x_positions[0], y, x_positions[-1], y)
+        for x in x_positions:
+            canvas.line(x, top, x, bottom)
+        for i, cells in enumerate([[name for name, _ in columns], *rows]):
+            y = top - (i + 1) * ROW_HEIGHT + 4
+            for x, cell in zip(x_positions, cells):
+                if cell:
+                    canvas.text(x + 3, y, cell, bold=i == 0)
+
+    def _offices_with_applications(self, n_applications):
+        """
+        Splits the applications of a category among the offices, keeping only the offices with applications.
+        Returns ((office, number of applications), office code) pairs.
+        """
+        size, remainder = divmod(n_applications, len(OFFICES))
+        result = []
+        for i, (office, office_code) in enumerate(OFFICES):
+            n_office_applications = size + (1 if i < remainder else 0)
+            if n_office_applications:
+                result.append(((office, n_office_applications), office_code))
+        return result
+
+
+if __name__ == '__main__':
+    journal = SyntheticJournal(n_early=500, n_after_18_months=500, n_fer=1000, n_grants=1000, parts=2)
+    print(journal.write('synthetic'))
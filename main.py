@@ -1,10 +1,8 @@
-from pathlib import Path
+from pprint import pprint
 
-from ipindia.date_processor import DateProcessor
+from ipindia.batch_processor import BatchProcessor
 
-year_path = Path('2005')
-date_directories = sorted(item for item in year_path.iterdir() if item.is_dir())
-for date_directory in date_directories[:]:
-    print(f'-----Processing {date_directory}-----')
-    processor = DateProcessor(date_directory)
-    processor.export_data()
+if __name__ == '__main__':
+    batch = BatchProcessor(years=range(2005, 2006), use_manifest=True)
+    summaries = batch.run()
+    pprint(summaries)
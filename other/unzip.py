@@ -1,38 +1,68 @@
-import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 
 class UnZip:
-    def __init__(self, id_num: int):
+    """
+    Extracts <id>.zip next to it, streaming every member directly to its place.
+    The pdf.zip and csv.zip archives nested inside the archives of the previous format are extracted into the pdf
+    and csv directories straight from the outer archive, without writing them to disk first.
+    """
+    nested_archives = {'pdf.zip', 'csv.zip'}
+
+    def __init__(self, id_num: int, root=Path('../files'), remove_archive=True):
         self.id = str(id_num).zfill(3)
-        self.id_zip = (Path('../files') / self.id).with_suffix('.zip')
+        self.root = Path(root)
+        self.id_zip = (self.root / self.id).with_suffix('.zip')
         self.id_dir = self.id_zip.parent / self.id
-        self.pdf_zip = (self.id_dir / 'pdf').with_suffix('.zip')
-        self.csv_zip = (self.id_dir / 'csv').with_suffix('.zip')
+        self.remove_archive = remove_archive
         self.validate()
 
-    @staticmethod
-    def unzip_file(zip_file: Path, main_directory=False):
-        if main_directory:
-            target_dir = zip_file.parent
-        else:
-            target_dir = zip_file.with_suffix('')
-            target_dir.mkdir()
-        shutil.unpack_archive(zip_file, target_dir, 'zip')
-        macosx_path = target_dir / '__MACOSX'
-        if macosx_path.exists():
-            shutil.rmtree(macosx_path)
-        zip_file.unlink()
-
     def unzip_all(self):
-        self.unzip_file(self.id_zip, main_directory=True)
-        for file in (self.pdf_zip, self.csv_zip):
-            self.unzip_file(file)
+        with zipfile.ZipFile(self.id_zip) as archive:
+            for member in archive.infolist():
+                if self.is_ignored(member):
+                    continue
+                member_path = Path(member.filename)
+                if member_path.name in self.nested_archives:
+                    target_dir = self.root / member_path.with_suffix('')
+                    target_dir.mkdir(parents=True, exist_ok=True)
+                    with archive.open(member) as nested_file, zipfile.ZipFile(nested_file) as nested_archive:
+                        self.extract_members(nested_archive, target_dir)
+                else:
+                    archive.extract(member, self.root)
+        if self.remove_archive:
+            self.id_zip.unlink()
+        print(f'{self.id_zip} extracted')
+        return self.id_dir
+
+    def extract_members(self, archive, target_dir):
+        for member in archive.infolist():
+            if not self.is_ignored(member):
+                archive.extract(member, target_dir)
+
+    @staticmethod
+    def is_ignored(member):
+        return member.is_dir() or member.filename.startswith('__MACOSX/') or member.filename.endswith('.DS_Store')
 
     def validate(self):
         assert self.id_zip.exists(), f'{self.id_zip} does not exist'
 
 
+def unzip_id(id_num, root=Path('../files'), remove_archive=True):
+    return UnZip(id_num, root, remove_archive).unzip_all()
+
+
+def unzip_many(id_nums, root=Path('../files'), remove_archive=True, max_workers=None):
+    """
+    Extracts several ids in parallel, one process per archive.
+    """
+    id_nums = list(id_nums)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(unzip_id, id_nums, [root] * len(id_nums), [remove_archive] * len(id_nums)))
+
+
 if __name__ == '__main__':
     unzip = UnZip(5)
     unzip.unzip_all()
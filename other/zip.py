@@ -1,43 +1,65 @@
+import os
 import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 
 class Zip:
-    def __init__(self, id_num: int):
+    """
+    Archives the directory of an id into <id>.zip, streaming every file directly into the archive.
+    The PDF files, which are already compressed, are stored as they are; the other files are deflated.
+    Archives larger than 4 GiB use ZIP64.
+    """
+    stored_suffixes = {'.pdf', '.zip', '.parquet'}
+
+    def __init__(self, id_num: int, root=Path('../files'), remove_sources=True):
         self.id = str(id_num).zfill(3)
-        self.directory_id = Path('../files') / self.id
+        self.root = Path(root)
+        self.directory_id = self.root / self.id
         self.directory_pdf = self.directory_id / 'pdf'
         self.directory_csv = self.directory_id / 'csv'
+        self.zip_path = self.root / f'{self.id}.zip'
+        self.remove_sources = remove_sources
         self.validate()
 
-    def zip_dir(self, directory: Path):
-        output_filename = str(directory)
-        shutil.make_archive(output_filename, 'zip', directory)
-        shutil.rmtree(directory)
-
     def zip_all(self):
-        # self.directory_pdf.mkdir()
-        # for pdf in self.directory_id.glob('*.pdf'):
-        #     shutil.move(pdf, self.directory_pdf)
-        # for dir in (self.directory_pdf, self.directory_id):
-        #     self.zip_dir(dir)
-        self.zip_dir(self.directory_pdf)
-        new = Path('../files') / 'new'
-        new.mkdir()
-        shutil.move(self.directory_id, new)
-        shutil.make_archive(str(new), 'zip', new)
-        zip_result = Path('../files') / 'new.zip'
-        zip_result.rename(self.directory_id.parent / f'{self.id}.zip')
-        shutil.rmtree(new)
+        partial_path = self.zip_path.with_name(f'{self.zip_path.name}.partial')
+        with zipfile.ZipFile(partial_path, 'w', allowZip64=True) as archive:
+            for path in sorted(self.directory_id.rglob('*')):
+                if path.name == '.DS_Store' or path.is_dir():
+                    continue
+                arcname = path.relative_to(self.root).as_posix()
+                archive.write(path, arcname, compress_type=self.compress_type(path))
+        os.replace(partial_path, self.zip_path)
+        if self.remove_sources:
+            shutil.rmtree(self.directory_id)
+        print(f'{self.zip_path} created')
+        return self.zip_path
+
+    def compress_type(self, path: Path):
+        if path.suffix.lower() in self.stored_suffixes:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
 
     def validate(self):
-        return True
-        # for dir in (self.directory_pdf, self.directory_csv, self.directory_id):
-        #     assert dir.exists(), f'{dir} does not exist'
+        assert self.directory_id.exists(), f'{self.directory_id} does not exist'
+
+
+def zip_id(id_num, root=Path('../files'), remove_sources=True):
+    return Zip(id_num, root, remove_sources).zip_all()
+
+
+def zip_many(id_nums, root=Path('../files'), remove_sources=True, max_workers=None):
+    """
+    Archives several ids in parallel, one process per archive.
+    """
+    id_nums = list(id_nums)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(zip_id, id_nums, [root] * len(id_nums), [remove_sources] * len(id_nums)))
 
 
 if __name__ == '__main__':
-    # for i in range(3, 82):
-    #     Zip(i).zip_all()
+    # zip_many(range(3, 82))
     zip = Zip(5)
     zip.zip_all()
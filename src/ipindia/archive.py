@@ -0,0 +1,295 @@
+"""
+Implements the ArchivePath class, which lets the journals be processed straight from the ZIP archives created by
+other/zip.py, without extracting them. The archives of the previous format, with the PDF files in a pdf.zip archive
+nested in the archive of the id, are read too.
+"""
+import io
+import mmap
+import shutil
+import struct
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from fnmatch import fnmatch
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+from types import SimpleNamespace
+
+# size of the fixed part of the local file header of a ZIP member
+LOCAL_HEADER_SIZE = 30
+# names of the archives nested in the archives of the previous format, whose members are listed as a directory
+NESTED_ARCHIVES = ('pdf.zip',)
+
+
+class MemberStream(io.RawIOBase):
+    """
+    A read-only, seekable stream over a member stored without compression in a ZIP archive. The archive is
+    memory-mapped, so the bytes of the member are read from the page cache without being copied to disk or
+    loaded in memory all at once.
+    """
+
+    def __init__(self, archive_path, offset, size):
+        super().__init__()
+        self._file = open(archive_path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)[offset:offset + size]
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        else:
+            position = self._size + offset
+        if position < 0:
+            raise ValueError('Negative seek position')
+        self._position = position
+        return position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            end = self._size
+        else:
+            end = min(self._size, self._position + size)
+        data = bytes(self._view[self._position:end]) if end > self._position else b''
+        self._position = max(self._position, end)
+        return data
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._map.close()
+            self._file.close()
+        super().close()
+
+
+class ArchiveDirectory:
+    """
+    The central directory of a ZIP archive, indexed to answer the queries of ArchivePath without scanning it: the
+    names of the members (without the trailing slash of directories), their ZipInfo, and the children of every
+    directory, in the order of the archive.
+    The members of a nested archive, e.g. 001/pdf.zip, are listed in a directory named after it, e.g. 001/pdf, along
+    with the nested archive that contains each of them.
+    """
+
+    def __init__(self, infos, nested_infos=None):
+        self.names = set()
+        self.infos = {}
+        self.children = {}
+        self.containers = {}
+        for info in infos:
+            self._add(info.filename.rstrip('/'), info)
+        for container, container_infos in (nested_infos or {}).items():
+            directory = str(PurePosixPath(container).with_suffix(''))
+            for info in container_infos:
+                if info.is_dir():
+                    continue
+                name = f'{directory}/{PurePosixPath(info.filename)}'
+                self._add(name, info)
+                self.containers[name] = container
+
+    def _add(self, name, info):
+        self.names.add(name)
+        self.infos[name] = info
+        parts = name.split('/')
+        for depth in range(len(parts)):
+            parent = '/'.join(parts[:depth])
+            children = self.children.setdefault(parent, {})
+            children.setdefault(parts[depth], None)
+
+
+@lru_cache(maxsize=64)
+def read_archive_directory(archive_path, mtime_ns, size):
+    """
+    Reads the central directory of a ZIP archive and of the archives nested in it. It is cached per archive,
+    modification time and size, so walking a date inside an archive parses its directory once instead of once per
+    path operation, and a rewritten archive is read again.
+    """
+    with zipfile.ZipFile(archive_path) as archive:
+        infos = archive.infolist()
+        nested_infos = {}
+        for info in infos:
+            if PurePosixPath(info.filename).name in NESTED_ARCHIVES:
+                with archive.open(info) as file, zipfile.ZipFile(file) as nested_archive:
+                    nested_infos[info.filename] = nested_archive.infolist()
+    return ArchiveDirectory(infos, nested_infos)
+
+
+class ArchivePath:
+    """
+    A path to a file or directory inside a ZIP archive, which can be used instead of the Path of a date directory
+    or a PDF file: it supports joining with /, name, stem, suffix, parent, iterdir, glob, exists, stat and
+    open('rb'). It only keeps the path of the archive and the name of the member, so it can be sent to worker
+    processes. In the archives of the previous format, the PDF files of a date are read from its nested pdf.zip
+    archive, as if it were the pdf directory.
+    """
+
+    def __init__(self, archive_path, member=''):
+        """
+        Parameters
+        ----------
+        archive_path: str or Path
+            The ZIP archive.
+        member: str, optional
+            The path of the member inside the archive, e.g. '001/pdf/Part I.pdf'. The default is the
+            root of the archive.
+        """
+        self.archive_path = Path(archive_path)
+        self.member = str(PurePosixPath(member)).strip('/') if member not in ('', '.') else ''
+
+    @classmethod
+    def from_path(cls, path):
+        """
+        Returns an ArchivePath if a component of the given path is a ZIP file, e.g. 'files/001.zip/001'.
+        Otherwise, returns the path as a Path.
+        """
+        path = Path(path)
+        for i, part in enumerate(path.parts):
+            candidate = Path(*path.parts[:i + 1])
+            if part.lower().endswith('.zip') and candidate.is_file():
+                return cls(candidate, '/'.join(path.parts[i + 1:]))
+        return path
+
+    @property
+    def name(self):
+        return PurePosixPath(self.member).name
+
+    @property
+    def stem(self):
+        return PurePosixPath(self.member).stem
+
+    @property
+    def suffix(self):
+        return PurePosixPath(self.member).suffix
+
+    @property
+    def parent(self):
+        parent = str(PurePosixPath(self.member).parent)
+        return ArchivePath(self.archive_path, '' if parent == '.' else parent)
+
+    def __truediv__(self, other):
+        return ArchivePath(self.archive_path, f'{self.member}/{other}' if self.member else str(other))
+
+    def extraction_path(self):
+        """
+        The path the member would have if the archive were extracted next to it.
+        """
+        return self.archive_path.parent / self.member
+
+    def iterdir(self):
+        return [self / child for child in self._directory().children.get(self.member, ())]
+
+    def glob(self, pattern):
+        """
+        Returns the children whose name matches the pattern. Only patterns without directories are supported.
+        """
+        return [child for child in self.iterdir() if fnmatch(child.name, pattern)]
+
+    def exists(self):
+        return self.is_file() or self.is_dir()
+
+    def is_file(self):
+        return self.member in self._directory().names
+
+    def is_dir(self):
+        return self.member in self._directory().children
+
+    def stat(self):
+        info = self._info()
+        mtime = datetime(*info.date_time).timestamp()
+        return SimpleNamespace(st_size=info.file_size, st_mtime_ns=int(mtime * 1e9))
+
+    def open(self, mode='rb'):
+        """
+        Opens the member for reading in binary mode. Members stored without compression, like the PDF files of the
+        archives, are memory-mapped, also inside a nested archive stored without compression; the others are
+        decompressed in memory, since they must be seekable.
+        """
+        if mode != 'rb':
+            raise ValueError(f'Archive members can only be opened in rb mode, not {mode}')
+        directory = self._directory()
+        info = self._info()
+        container = directory.containers.get(self.member)
+        base_offset = 0
+        if container is not None:
+            container_info = directory.infos[container]
+            if container_info.compress_type != zipfile.ZIP_STORED or info.compress_type != zipfile.ZIP_STORED:
+                with ArchivePath(self.archive_path, container).open() as file, zipfile.ZipFile(file) as archive:
+                    return io.BytesIO(archive.read(info))
+            base_offset = self._data_offset(container_info)
+        elif info.compress_type != zipfile.ZIP_STORED:
+            with zipfile.ZipFile(self.archive_path) as archive:
+                return io.BytesIO(archive.read(info))
+        return MemberStream(self.archive_path, self._data_offset(info, base_offset), info.file_size)
+
+    def _data_offset(self, info, base_offset=0):
+        """
+        The offset in the archive file of the data of a member, given the offset of the (nested) archive it is in.
+        """
+        header_offset = base_offset + info.header_offset
+        with open(self.archive_path, 'rb') as file:
+            file.seek(header_offset)
+            header = file.read(LOCAL_HEADER_SIZE)
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        return header_offset + LOCAL_HEADER_SIZE + name_length + extra_length
+
+    def _directory(self):
+        stat = self.archive_path.stat()
+        return read_archive_directory(self.archive_path, stat.st_mtime_ns, stat.st_size)
+
+    def _info(self):
+        try:
+            return self._directory().infos[self.member]
+        except KeyError:
+            raise KeyError(f'There is no item named {self.member!r} in the archive') from None
+
+    def __str__(self):
+        return f'{self.archive_path}/{self.member}'
+
+    def __repr__(self):
+        return f'ArchivePath({str(self.archive_path)!r}, {self.member!r})'
+
+    def __eq__(self, other):
+        return isinstance(other, ArchivePath) and (self.archive_path, self.member) == (other.archive_path, other.member)
+
+    def __lt__(self, other):
+        return (str(self.archive_path), self.member) < (str(other.archive_path), other.member)
+
+    def __hash__(self):
+        return hash((self.archive_path, self.member))
+
+
+@contextmanager
+def local_copy(path):
+    """
+    Gives a filesystem path with the content of the given path, for the libraries that cannot read streams.
+    Archive members are copied to a temporary file, which is deleted at the end of the block.
+    """
+    if not isinstance(path, ArchivePath):
+        yield str(path)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        copy_path = Path(directory) / path.name
+        with path.open('rb') as source, open(copy_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        yield str(copy_path)
@@ -0,0 +1,205 @@
+"""
+Implements the BatchProcessor class, which processes many date directories in parallel.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+
+from ipindia.date_processor import DateProcessor
+from ipindia.manifest import DateManifest
+from ipindia.metrics import log_json_lines, metrics
+
+
+def process_date(date_directory, processor_options=None, metrics_log_path=None):
+    """
+    Processes a single date directory. It runs inside a worker process of the pool.
+
+    Parameters
+    ----------
+    date_directory: Path
+        The directory of the date, containing the pdf directory.
+    processor_options: dict, optional
+        The keyword arguments passed to DateProcessor, e.g. page_workers or streaming.
+    metrics_log_path: Path, optional
+        If given, the JSON log lines of the stages are appended to this file.
+
+    Returns
+    -------
+    dict
+        A summary of the processing of the date, with the totals of its stages in 'metrics'.
+    """
+    if metrics_log_path is not None:
+        log_json_lines(metrics_log_path)
+    # the worker processes are reused, so only the stages of this date are sent back
+    metrics.reset()
+    start = time.perf_counter()
+    summary = {'date': date_directory.name, 'path': str(date_directory)}
+    try:
+        processor = DateProcessor(date_directory, **(processor_options or {}))
+        processor.export_data()
+    except Exception as error:
+        summary.update(status='failed', error=f'{type(error).__name__}: {error}')
+    else:
+        summary.update(status='done', error=None, categories=list(processor.categories))
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    summary['metrics'] = metrics.snapshot()
+    return summary
+
+
+def parse_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class BatchProcessor:
+    """
+    Class to process the date directories of several years with a pool of processes.
+    The largest journals are scheduled first, so that they do not become the stragglers of the batch.
+    """
+
+    def __init__(self, root='.', years=None, start_date=None, end_date=None, max_workers=None, s3_sync=None,
+                 metrics_path=None, metrics_log_path=None, **processor_options):
+        """
+        Parameters
+        ----------
+        root: str or Path, optional
+            The directory containing one directory per year. The default is the current directory.
+        years: iterable of int, optional
+            The years to process, e.g. range(2005, 2024). If not given, they are derived from the date range.
+        start_date: str or date, optional
+            The first date to process, formatted as YYYY-MM-DD.
+        end_date: str or date, optional
+            The last date to process, formatted as YYYY-MM-DD.
+        max_workers: int, optional
+            The number of worker processes. The default is the number of CPUs.
+        s3_sync: S3Sync, optional
+            If given, every date directory is uploaded with it as soon as it is processed.
+        metrics_path: str or Path, optional
+            If given, the totals of the stages of all the dates are written to this Prometheus textfile (e.g.
+            in the directory of the textfile collector of node_exporter) every time a date finishes.
+        metrics_log_path: str or Path, optional
+            If given, every run of a stage is appended to this file as a JSON line.
+        processor_options:
+            The keyword arguments passed to the DateProcessor of every date, e.g. page_workers or streaming.
+            With use_manifest=True, the dates whose manifest shows them unchanged are skipped without being sent
+            to the workers.
+        """
+        self.root = Path(root)
+        self.start_date = parse_date(start_date)
+        self.end_date = parse_date(end_date)
+        self.years = self._resolve_years(years)
+        self.max_workers = max_workers or os.cpu_count()
+        self.s3_sync = s3_sync
+        self.metrics_path = metrics_path
+        self.metrics_log_path = metrics_log_path
+        self.processor_options = processor_options
+
+    def run(self):
+        """
+        Main method. Processes all the date directories and returns a summary per date, sorted by date.
+        """
+        date_directories = self.schedule(self.find_date_directories())
+        summaries = []
+        if self.processor_options.get('use_manifest'):
+            date_directories, unchanged_directories = self.split_unchanged(date_directories)
+            for directory in unchanged_directories:
+                summaries.append({'date': directory.name, 'path': str(directory), 'status': 'unchanged',
+                                  'error': None, 'seconds': 0})
+            print(f'Skipping {len(unchanged_directories)} unchanged dates')
+        print(f'Processing {len(date_directories)} dates with {self.max_workers} workers', end='\n' * 2)
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(process_date, directory, self.processor_options, self.metrics_log_path)
+                       for directory in date_directories]
+            for future in as_completed(futures):
+                summary = future.result()
+                metrics.merge(summary.pop('metrics'))
+                if self.metrics_path is not None:
+                    metrics.write_textfile(self.metrics_path)
+                print(f'-----{summary["date"]}: {summary["status"]} in {summary["seconds"]} seconds-----')
+                if summary['error']:
+                    print(summary['error'])
+                elif self.s3_sync is not None:
+                    self.upload(summary)
+                summaries.append(summary)
+        return sorted(summaries, key=lambda s: s['date'])
+
+    def upload(self, summary):
+        """
+        Uploads a processed date with s3_sync. An upload error (e.g. of the network or the credentials) is recorded in
+        the summary instead of stopping the batch, so the other dates are still processed and uploaded.
+        """
+        try:
+            summary['upload'] = self.s3_sync.sync_directory(Path(summary['path']))
+        except Exception as error:
+            summary['upload'] = {'error': f'{type(error).__name__}: {error}'}
+            print(f'Upload failed: {summary["upload"]["error"]}')
+
+    def find_date_directories(self):
+        date_directories = []
+        for year in self.years:
+            year_path = self.root / str(year)
+            if not year_path.is_dir():
+                print(f'{year_path} does not exist')
+                continue
+            for item in sorted(year_path.iterdir()):
+                if item.is_dir() and self._is_in_date_range(item.name):
+                    date_directories.append(item)
+        return date_directories
+
+    def split_unchanged(self, date_directories):
+        """
+        Separates the date directories that must be processed from the ones whose manifest shows that all their
+        categories were exported from the current PDF files with the current parser version.
+        """
+        output_format = self.processor_options.get('output_format', 'csv')
+        pending_directories = []
+        unchanged_directories = []
+        for directory in date_directories:
+            if DateManifest(directory).is_complete(output_format):
+                unchanged_directories.append(directory)
+            else:
+                pending_directories.append(directory)
+        return pending_directories, unchanged_directories
+
+    @staticmethod
+    def schedule(date_directories):
+        """
+        Sorts the date directories so that the ones with the largest PDF files go first.
+        """
+        return sorted(date_directories, key=BatchProcessor.journal_size, reverse=True)
+
+    @staticmethod
+    def journal_size(date_directory):
+        return sum(pdf.stat().st_size for pdf in (date_directory / 'pdf').glob('*.pdf'))
+
+    # ------------------------------
+    # Auxiliary methods
+    # ------------------------------
+
+    def _resolve_years(self, years):
+        if years is not None:
+            return sorted(int(year) for year in years)
+        if self.start_date is None or self.end_date is None:
+            raise ValueError('Either years or both start_date and end_date must be given')
+        return list(range(self.start_date.year, self.end_date.year + 1))
+
+    def _is_in_date_range(self, name):
+        try:
+            current = parse_date(name)
+        except ValueError:
+            return False
+        if self.start_date is not None and current < self.start_date:
+            return False
+        if self.end_date is not None and current > self.end_date:
+            return False
+        return True
+
+
+if __name__ == '__main__':
+    from pprint import pprint
+
+    batch = BatchProcessor(years=range(2005, 2006), use_manifest=True)
+    pprint(batch.run())
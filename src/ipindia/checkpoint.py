@@ -0,0 +1,83 @@
+"""
+Implements the ChunkCheckpoints class, which saves the records parsed from every page chunk of a date, so that an
+interrupted export resumes from the chunks that were not finished.
+"""
+import os
+import pickle
+import shutil
+
+from ipindia.manifest import PARSER_VERSION
+from ipindia.page_store import file_sha256
+from ipindia.writers import category_slug
+
+
+class ChunkCheckpoints:
+    """
+    Class to save and load the records parsed from the page chunks of the PDF files of a date.
+
+    Every chunk is saved in its own pickle file, in a directory per category inside the checkpoints directory of
+    the date. The name of the file contains the hash of the PDF file, the parser version, the extraction range and
+    the page chunk, so a checkpoint is only found for the same input parsed by the same code.
+    The checkpoints of a category are deleted once all its records are written.
+    """
+    directory_name = 'checkpoints'
+
+    def __init__(self, date_directory, pdf_hash=file_sha256):
+        """
+        Parameters
+        ----------
+        date_directory: Path
+            The directory of the date, containing the pdf directory.
+        pdf_hash: callable, optional
+            Returns the SHA-256 hash of a PDF file, e.g. DateProcessor.pdf_hash, which reuses the hashes already
+            computed for the date. The default computes it, once per file.
+        """
+        self.directory = date_directory / self.directory_name
+        self.pdf_hash = pdf_hash
+        self._hashes = {}
+
+    def exists(self, category, pdf_path, chunk, extraction_start, extraction_end):
+        return self._checkpoint_path(category, pdf_path, chunk, extraction_start, extraction_end).exists()
+
+    def load(self, category, pdf_path, chunk, extraction_start, extraction_end):
+        """
+        Returns the (applications, applicant names, inventor names) saved for a page chunk, or None if the chunk
+        has no checkpoint.
+        """
+        path = self._checkpoint_path(category, pdf_path, chunk, extraction_start, extraction_end)
+        if not path.exists():
+            return None
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    def save(self, category, pdf_path, chunk, extraction_start, extraction_end, records):
+        """
+        Saves the records parsed from a page chunk. They are written to a temporary file which is then moved to
+        its place, so that an interrupted save does not leave a truncated checkpoint.
+        """
+        path = self._checkpoint_path(category, pdf_path, chunk, extraction_start, extraction_end)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(f'{path.name}.tmp')
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(records, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    def clear(self, category):
+        """
+        Deletes the checkpoints of a category.
+        """
+        shutil.rmtree(self.directory / category_slug(category), ignore_errors=True)
+        if self.directory.exists() and not any(self.directory.iterdir()):
+            self.directory.rmdir()
+
+    def _checkpoint_path(self, category, pdf_path, chunk, extraction_start, extraction_end):
+        first_index, last_index = chunk
+        pdf_hash = self._pdf_hash(pdf_path)[:16]
+        name = (f'{pdf_path.stem}-{pdf_hash}-v{PARSER_VERSION}-{extraction_start}-{extraction_end}'
+                f'-{first_index}-{last_index}.pkl')
+        return self.directory / category_slug(category) / name
+
+    def _pdf_hash(self, pdf_path):
+        if pdf_path not in self._hashes:
+            self._hashes[pdf_path] = self.pdf_hash(pdf_path)
+        return self._hashes[pdf_path]
@@ -0,0 +1,35 @@
+"""
+Helpers to split page ranges into chunks that can be processed independently.
+"""
+
+
+def split_range(start, stop, n_chunks):
+    """
+    Splits the range [start, stop) into at most n_chunks contiguous ranges of similar size.
+
+    Parameters
+    ----------
+    start: int
+        The first index of the range.
+    stop: int
+        The index after the last one of the range.
+    n_chunks: int
+        The maximum number of chunks.
+
+    Returns
+    -------
+    list of tuple
+        The (start, stop) pairs of the chunks, in order.
+    """
+    total = stop - start
+    if total <= 0:
+        return []
+    n_chunks = max(1, min(n_chunks, total))
+    size, remainder = divmod(total, n_chunks)
+    chunks = []
+    chunk_start = start
+    for i in range(n_chunks):
+        chunk_stop = chunk_start + size + (1 if i < remainder else 0)
+        chunks.append((chunk_start, chunk_stop))
+        chunk_start = chunk_stop
+    return chunks
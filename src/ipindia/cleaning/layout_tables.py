@@ -0,0 +1,211 @@
+"""
+Table engine based on the text extracted by pdftotext in physical layout mode (like `pdftotext -layout`).
+
+The FER and 43(2) grant sections are fixed-column grids, so their columns can be inferred once per section from
+the character offsets of the header and the first rows, and every following line can be split by those offsets.
+It is much faster than pdfplumber's extract_table, which it falls back to when the column check fails.
+"""
+import re
+
+import pandas as pd
+
+from ipindia.cleaning.tables import clean_data
+from ipindia.metrics import metrics
+
+
+class LayoutTableError(ValueError):
+    """
+    Raised when the text layout of a section is not a grid whose columns can be trusted.
+    """
+
+
+class LayoutTable:
+    """
+    Class to extract the table of a section from the layout text of its pages.
+    """
+    row_pattern = re.compile(r'^\s*(\d+)\s{2,}\S')
+    page_number_pattern = re.compile(r'^\s*\d+\s*$')
+    cell_gap_pattern = re.compile(r'\S\s{2,}(?=\S)')
+    journal_marker = 'The Patent Office Journal'
+    min_gap = 2
+
+    def __init__(self, pages, correct_serial_number=False):
+        """
+        Parameters
+        ----------
+        pages: list of str
+            The layout text of the pages of the section. The first one must contain the header row.
+        correct_serial_number: bool, optional
+            If True, the first column is renamed to 'Serial Number'.
+        """
+        self.pages = [page.splitlines() for page in pages]
+        self.correct_serial_number = correct_serial_number
+        self.column_starts = []
+        self.columns = []
+
+    def extract(self):
+        """
+        Main method. Returns the table as a DataFrame with the same shape as cleaning.tables.extract_data.
+
+        Raises
+        ------
+        LayoutTableError
+            If the columns cannot be inferred or some line does not fit them.
+        """
+        header_lines, first_rows = self._split_first_page()
+        self.column_starts = self._infer_column_starts(header_lines + first_rows)
+        if len(self.column_starts) < 2:
+            raise LayoutTableError('Less than two columns detected')
+        self.columns = self._build_header(header_lines)
+        for line in first_rows:
+            if not self._split_line(line)[0].isdigit():
+                raise LayoutTableError(f'Serial number is not an integer: {line.strip()}')
+        rows = []
+        for lines in self.pages:
+            page_rows, table_ends = self._split_rows(lines)
+            rows.extend(page_rows)
+            if not page_rows or table_ends:
+                break
+        df = pd.DataFrame(rows, columns=self.columns)
+        if self.correct_serial_number:
+            df.rename(columns={df.columns[0]: 'Serial Number'}, inplace=True)
+        return df
+
+    # ------------------------------
+    # Column inference
+    # ------------------------------
+
+    def _split_first_page(self):
+        """
+        Returns the header lines above the first row of the first page, and the lines of the page that start a row:
+        the ones beginning with a number that ends before the second column of the header. So a continuation line
+        beginning with digits (e.g. the rest of a wrapped application number) is not taken for a row.
+        """
+        lines = self.pages[0]
+        first_row = next((i for i, line in enumerate(lines) if self.row_pattern.match(line)), None)
+        if first_row is None:
+            raise LayoutTableError('No rows found in the first page')
+        header_start = first_row
+        while header_start > 0 and lines[header_start - 1].strip():
+            if self._is_journal_line(lines[header_start - 1]):
+                break
+            header_start -= 1
+        if header_start == first_row:
+            raise LayoutTableError('No header found above the first row')
+        header_lines = lines[header_start:first_row]
+        second_column_start = min(self._second_cell_start(line) for line in header_lines)
+        rows = []
+        for line in lines[first_row:]:
+            match = self.row_pattern.match(line)
+            if match and match.end(1) <= second_column_start:
+                rows.append(line)
+        return header_lines, rows
+
+    def _second_cell_start(self, line):
+        match = self.cell_gap_pattern.search(line)
+        return match.end() if match else len(line)
+
+    def _infer_column_starts(self, lines):
+        width = max(len(line) for line in lines)
+        occupied = [False] * width
+        for line in lines:
+            for offset, character in enumerate(line):
+                if not character.isspace():
+                    occupied[offset] = True
+        starts = []
+        blank_run = self.min_gap
+        for offset, is_occupied in enumerate(occupied):
+            if is_occupied:
+                if blank_run >= self.min_gap:
+                    starts.append(offset)
+                blank_run = 0
+            else:
+                blank_run += 1
+        return starts
+
+    def _build_header(self, header_lines):
+        cells = [self._split_line(line) for line in header_lines]
+        header = [re.sub(r'\s+', ' ', ' '.join(parts)).strip() for parts in zip(*cells)]
+        if not all(header):
+            raise LayoutTableError('Some column has no header')
+        return header
+
+    # ------------------------------
+    # Row splitting
+    # ------------------------------
+
+    def _split_rows(self, lines):
+        """
+        Splits the lines of a page into rows. A line fitting the columns starts a row if its serial number cell is an
+        integer, and continues the cells of the previous row if that cell is empty. Any other line ends the table,
+        and the rest of the page is not part of it, unless it looks like a row, which means the columns are wrong.
+
+        Returns
+        -------
+        tuple
+            The rows of the page, and True if the table ends in it.
+        """
+        rows = []
+        for line in self._body_lines(lines):
+            cells = self._fitting_cells(line)
+            if cells is not None and cells[0].isdigit():
+                rows.append(cells)
+            elif cells is not None and not cells[0]:
+                if rows:
+                    rows[-1] = [f'{old}\n{new}' if old and new else old or new for old, new in zip(rows[-1], cells)]
+            elif self.row_pattern.match(line):
+                raise LayoutTableError(f'Row does not fit the columns: {line.strip()}')
+            elif rows:
+                return rows, True
+        return rows, False
+
+    def _body_lines(self, lines):
+        """
+        Returns the non-empty lines of a page without the journal header and the page number. Only the last line of
+        the page can be the page number, so numeric lines inside the table (e.g. the second half of a wrapped
+        application number) are kept.
+        """
+        lines = [line for line in lines if line.strip()]
+        if lines and self.page_number_pattern.match(lines[-1]):
+            lines.pop()
+        return [line for line in lines if not self._is_journal_line(line)]
+
+    def _is_journal_line(self, line):
+        return self.journal_marker in line
+
+    def _fitting_cells(self, line):
+        """
+        Returns the cells of a line, or None if the line does not fit the columns: it has text before the first
+        column or across a column boundary.
+        """
+        try:
+            return self._split_line(line)
+        except LayoutTableError:
+            return None
+
+    def _split_line(self, line):
+        if line[:self.column_starts[0]].strip():
+            raise LayoutTableError(f'Text before the first column: {line.strip()}')
+        bounds = self.column_starts + [max(len(line), self.column_starts[-1] + 1)]
+        cells = []
+        for start, stop in zip(bounds, bounds[1:]):
+            straddles = 0 < start < len(line) and not line[start - 1].isspace() and not line[start].isspace()
+            if straddles:
+                raise LayoutTableError(f'Text crosses a column boundary: {line.strip()}')
+            cells.append(line[start:stop].strip())
+        return cells
+
+
+def extract_layout_data(layout_pages, start_index=0, end_index=None, correct_serial_number=False):
+    page_indices = [start_index, *range(len(layout_pages))[start_index + 1:end_index]]
+    with metrics.stage('table_extraction', engine='layout') as stage:
+        pages = [layout_pages[i] for i in page_indices]
+        df = LayoutTable(pages, correct_serial_number).extract()
+        stage.add(pages=len(pages), records=len(df))
+    return df
+
+
+def process_layout_data(layout_pages, start_index=0, end_index=None, correct_serial_number=False):
+    df = extract_layout_data(layout_pages, start_index, end_index, correct_serial_number)
+    clean_data(df)
+    return df
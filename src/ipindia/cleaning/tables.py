@@ -1,25 +1,70 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
-import pdfplumber
-
-
-def extract_data(path, start_index=0, end_index=None, correct_serial_number=False):
-    with pdfplumber.open(path) as pdf:
-        pages = pdf.pages
-        first_page = pages[start_index]
-        first_table = first_page.extract_table()
-        df = pd.DataFrame(first_table[1:], columns=first_table[0])
-        df.columns = df.columns.str.replace(r'\s+', ' ', regex=True)
-        df.columns = df.columns.str.strip()
-        if correct_serial_number:
-            df.rename(columns={df.columns[0]: 'Serial Number'}, inplace=True)
-        for page in pages[start_index + 1:end_index]:
-            table = page.extract_table()
-            new_df = pd.DataFrame(table)
-            try:
-                new_df.columns = df.columns
-            except ValueError:
+
+from ipindia.chunking import split_range
+from ipindia.document_session import DocumentSession, open_plumber, release_page
+from ipindia.metrics import metrics
+from ipindia.page_store import as_path
+
+
+def extract_tables_chunk(path, first_index, last_index, labels=None):
+    """
+    Worker function of the parallel mode. Extracts the tables of the pages of a chunk, releasing every page
+    once its table is extracted. The tables are returned with the snapshot of the metrics of the chunk.
+    """
+    tables = []
+    with metrics.task('table_chunk', **(labels or {})) as task, open_plumber(path) as pdf:
+        for page in pdf.pages[first_index:last_index]:
+            tables.append(page.extract_table())
+            release_page(page)
+        task.add(pages=len(tables), records=sum(len(table) for table in tables if table))
+    return tables, metrics.snapshot()
+
+
+def iter_tables(path, page_indices, session, workers=1, chunks_per_worker=4):
+    """
+    Yields the tables of the given pages, in page order.
+    """
+    if workers > 1 and len(page_indices) > 1:
+        chunks = split_range(page_indices.start, page_indices.stop, workers * chunks_per_worker)
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            for tables in metrics.merged(executor.map(extract_tables_chunk,
+                                                      [path] * len(chunks),
+                                                      [first for first, _ in chunks],
+                                                      [last for _, last in chunks],
+                                                      [metrics.current_labels()] * len(chunks))):
+                yield from tables
+        finally:
+            # the consumer stops at the first page without a matching table, so pending chunks are not needed
+            executor.shutdown(cancel_futures=True)
+        return
+    for index in page_indices:
+        yield session.extract_table(index)
+        session.release_page(index)
+
+
+def extract_data(path, start_index=0, end_index=None, correct_serial_number=False, session=None, workers=1):
+    if session is None:
+        with DocumentSession(path) as own_session:
+            return extract_data(path, start_index, end_index, correct_serial_number, own_session, workers)
+    with metrics.stage('table_extraction', pdf=as_path(path).name, engine='pdfplumber') as stage:
+        n_pages = len(session.plumber.pages)
+        first_table = session.extract_table(start_index)
+        session.release_page(start_index)
+        columns = pd.Index(first_table[0]).str.replace(r'\s+', ' ', regex=True).str.strip()
+        rows = list(first_table[1:])
+        n_table_pages = 1
+        for table in iter_tables(path, range(n_pages)[start_index + 1:end_index], session, workers):
+            if not table or len(table[0]) != len(columns):
                 break
-            df = pd.concat([df, new_df], ignore_index=True)
+            rows.extend(table)
+            n_table_pages += 1
+        stage.add(pages=n_table_pages, records=len(rows))
+    df = pd.DataFrame(rows, columns=columns)
+    if correct_serial_number:
+        df.rename(columns={df.columns[0]: 'Serial Number'}, inplace=True)
     return df
 
 
@@ -30,7 +75,7 @@ def clean_data(df):
     df.iloc[:, 0] = df.iloc[:, 0].astype(int)
 
 
-def process_data(path, start_index=0, end_index=None, correct_serial_number=False):
-    df = extract_data(path, start_index, end_index, correct_serial_number)
+def process_data(path, start_index=0, end_index=None, correct_serial_number=False, session=None, workers=1):
+    df = extract_data(path, start_index, end_index, correct_serial_number, session, workers)
     clean_data(df)
     return df
@@ -0,0 +1,170 @@
+"""
+Implements the Consolidator class, which merges the per-date CSV files of a range of dates into one dataset per
+category, keeping only the latest publication of every application.
+"""
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+
+import pandas as pd
+
+from ipindia.batch_processor import BatchProcessor
+
+
+class Consolidator:
+    """
+    Class to consolidate the CSV files exported by DateProcessor for a range of dates.
+
+    It works in bounded memory: the rows of every date are streamed in chunks and hash-partitioned by application
+    number into temporary files, so all the rows of an application end up in the same partition. Then every
+    partition is deduplicated on its own, keeping for each application the rows of its latest publication.
+    """
+    invention_categories = ['EARLY PUBLICATION', 'PUBLICATION AFTER 18 MONTHS']
+    # dataset name and key column of the datasets of the invention categories
+    invention_datasets = {
+        'applications': 'Application',
+        'applicant_names': 'Application No.',
+        'inventor_names': 'Application No.',
+    }
+    table_categories = ['WEEKLY ISSUED FER', 'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT']
+    date_column = 'Journal Date'
+
+    def __init__(self, root='.', years=None, start_date=None, end_date=None, output_directory='consolidated',
+                 n_partitions=64, chunksize=50000):
+        """
+        Parameters
+        ----------
+        root: str or Path, optional
+            The directory containing one directory per year. The default is the current directory.
+        years: iterable of int, optional
+            The years to consolidate. If not given, they are derived from the date range.
+        start_date: str or date, optional
+            The first date to consolidate, formatted as YYYY-MM-DD.
+        end_date: str or date, optional
+            The last date to consolidate, formatted as YYYY-MM-DD.
+        output_directory: str or Path, optional
+            The directory of the consolidated datasets. The default is 'consolidated'.
+        n_partitions: int, optional
+            The number of hash partitions. Each partition is loaded in memory on its own. The default is 64.
+        chunksize: int, optional
+            The number of rows read at once from the CSV files. The default is 50000.
+        """
+        self.date_directories = BatchProcessor(root, years, start_date, end_date).find_date_directories()
+        self.output_directory = Path(output_directory)
+        self.n_partitions = n_partitions
+        self.chunksize = chunksize
+
+    def consolidate_all(self):
+        """
+        Main method. Consolidates the datasets of all the categories and returns the paths of the results.
+        """
+        results = []
+        for category in self.invention_categories:
+            for name, key_column in self.invention_datasets.items():
+                sources = self._gather_sources(Path('csv') / category / f'{name}.csv')
+                destination = self.output_directory / category / f'{name}.csv'
+                keep_all_rows = name != 'applications'
+                if self.consolidate(sources, destination, key_column, keep_all_rows):
+                    results.append(destination)
+        for category in self.table_categories:
+            sources = self._gather_sources(Path('csv') / f'{category}.csv')
+            destination = self.output_directory / f'{category}.csv'
+            if self.consolidate(sources, destination, None, keep_all_rows=False):
+                results.append(destination)
+        return results
+
+    def consolidate(self, sources, destination, key_column=None, keep_all_rows=False):
+        """
+        Consolidates the given CSV files into the destination.
+
+        Parameters
+        ----------
+        sources: list of tuple
+            The (journal date, CSV file) pairs, sorted by date.
+        destination: Path
+            The consolidated CSV file.
+        key_column: str, optional
+            The column with the application number. If None, the first column whose name contains 'Application'.
+        keep_all_rows: bool, optional
+            If True, all the rows of the latest publication of an application are kept (e.g. all its applicants).
+            Otherwise, only the last one is kept.
+
+        Returns
+        -------
+        bool
+            True if there were sources to consolidate.
+        """
+        if not sources:
+            return False
+        columns = self._union_columns(sources)
+        if key_column is None:
+            key_column = next((column for column in columns if 'application' in column.lower()), columns[0])
+        print(f'Consolidating {len(sources)} files into {destination}')
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = destination.with_name(f'{destination.name}.partial')
+        partitions_directory = Path(tempfile.mkdtemp(prefix='partitions-', dir=destination.parent))
+        try:
+            partition_paths = self._partition(sources, columns, key_column, partitions_directory)
+            header = True
+            for partition_path in partition_paths:
+                df = pd.read_csv(partition_path, dtype=str, keep_default_na=False)
+                df = self._deduplicate(df, key_column, keep_all_rows)
+                df.to_csv(partial_path, mode='w' if header else 'a', header=header, index=False)
+                header = False
+            if header:
+                pd.DataFrame(columns=[*columns, self.date_column]).to_csv(partial_path, index=False)
+            partial_path.replace(destination)
+        finally:
+            shutil.rmtree(partitions_directory)
+        return True
+
+    # ------------------------------
+    # Auxiliary methods
+    # ------------------------------
+
+    def _gather_sources(self, relative_path):
+        sources = []
+        for date_directory in self.date_directories:
+            path = date_directory / relative_path
+            if path.exists() and path.stat().st_size > 1:
+                sources.append((date_directory.name, path))
+        return sorted(sources)
+
+    @staticmethod
+    def _union_columns(sources):
+        columns = []
+        for _, path in sources:
+            for column in pd.read_csv(path, nrows=0).columns:
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    def _partition(self, sources, columns, key_column, partitions_directory):
+        partition_paths = [partitions_directory / f'part-{i:04d}.csv' for i in range(self.n_partitions)]
+        for journal_date, path in sources:
+            for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=self.chunksize):
+                chunk = chunk.reindex(columns=columns, fill_value='')
+                chunk[self.date_column] = journal_date
+                partitions = chunk[key_column].map(lambda key: zlib.crc32(key.encode()) % self.n_partitions)
+                for partition, rows in chunk.groupby(partitions):
+                    partition_path = partition_paths[partition]
+                    rows.to_csv(partition_path, mode='a', header=not partition_path.exists(), index=False)
+        return [path for path in partition_paths if path.exists()]
+
+    def _deduplicate(self, df, key_column, keep_all_rows):
+        """
+        Keeps, for every application, the rows of its latest publication. Rows without application number are kept.
+        """
+        has_key = df[key_column].str.strip() != ''
+        keyed = df[has_key]
+        latest_dates = keyed.groupby(key_column)[self.date_column].transform('max')
+        keyed = keyed[keyed[self.date_column] == latest_dates]
+        if not keep_all_rows:
+            keyed = keyed.drop_duplicates(subset=key_column, keep='last')
+        return pd.concat([keyed, df[~has_key]], ignore_index=True)
+
+
+if __name__ == '__main__':
+    consolidator = Consolidator(years=range(2005, 2006))
+    print(consolidator.consolidate_all())
@@ -1,17 +1,22 @@
-import pandas as pd
-from pdftotext import PDF
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
 
+from ipindia.checkpoint import ChunkCheckpoints
+from ipindia.archive import ArchivePath
+from ipindia.chunking import split_range
+from ipindia.cleaning.layout_tables import LayoutTableError, process_layout_data
 from ipindia.cleaning.tables import process_data
-from ipindia.pdf_pages.basic_page import PdfPage
+from ipindia.document_session import DocumentSession
+from ipindia.manifest import DateManifest
+from ipindia.metrics import metrics
+from ipindia.page_store import PageTextStore, file_sha256, read_pdf, uses_page_store
 from ipindia.pdf_pages.contents_page import Contents
 from ipindia.pdf_pages.invention_page import InventionPage
+from ipindia.pdf_pages.page_index import PageNumberIndex
 from ipindia.pdf_sorter import PDFSorter
-
-
-def load_pdf(path):
-    with open(path, 'rb') as file:
-        pdf = PDF(file)
-    return pdf
+from ipindia.records import ApplicationRecord, PersonRecord
+from ipindia.sqlite_store import SQLiteBatchWriter, SQLiteStore
+from ipindia.writers import CsvBatchWriter, ParquetBatchWriter, partition_path
 
 
 def is_contents_page(text):
@@ -22,112 +27,504 @@ def is_invention_page(text):
     return 'Title of the invention' in text
 
 
+def iter_invention_pages(pdf, page_indices, extraction_start, extraction_end):
+    """
+    Lazily yields the invention pages among the given page indices whose page number is inside the extraction range.
+    Pages are discarded with cheap checks (text marker and footer page number) before being fully parsed.
+    """
+    for i in page_indices:
+        page = pdf[i]
+        if not is_invention_page(page):
+            continue
+        page_number = PageNumberIndex.read_page_number(page)
+        if extraction_start <= page_number <= extraction_end:
+            yield InventionPage(page)
+
+
+def extract_invention_records(pdf, page_indices, extraction_start, extraction_end):
+    """
+    Parses the invention pages among the given page indices whose page number is inside the extraction range.
+
+    Returns
+    -------
+    tuple of lists
+        The applications, applicant names and inventor names, in page order.
+    """
+    applications = []
+    applicant_names = []
+    inventor_names = []
+    for invention_page in iter_invention_pages(pdf, page_indices, extraction_start, extraction_end):
+        applications.append(invention_page.extract_application())
+        applicant_names.extend(invention_page.extract_applicant_names())
+        inventor_names.extend(invention_page.extract_inventor_names())
+    return applications, applicant_names, inventor_names
+
+
+def parse_invention_chunk(pdf_path, first_index, last_index, extraction_start, extraction_end, store_paths=None,
+                          labels=None):
+    """
+    Worker function of the page-parallel mode. It opens the PDF by itself, since PDF objects cannot be pickled.
+    store_paths are the data and index files of the page text store of the PDF, resolved by the parent process so
+    that the workers do not hash the PDF again. Without them, the pages are read with pdftotext.
+    The records are returned with the snapshot of the metrics of the chunk, labelled with the given labels.
+    """
+    page_indices = range(first_index, last_index)
+    with metrics.task('invention_chunk', **(labels or {})) as task:
+        if store_paths is None:
+            records = extract_invention_records(read_pdf(pdf_path), page_indices, extraction_start, extraction_end)
+        else:
+            with PageTextStore(pdf_path, *store_paths) as pdf:
+                records = extract_invention_records(pdf, page_indices, extraction_start, extraction_end)
+        task.add(pages=len(page_indices), records=len(records[0]))
+    return records, metrics.snapshot()
+
+
 class DateProcessor:
-    def __init__(self, path):
+    invention_categories = ['EARLY PUBLICATION', 'PUBLICATION AFTER 18 MONTHS']
+    table_categories = ['WEEKLY ISSUED FER', 'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT']
+    table_datasets = {
+        'WEEKLY ISSUED FER': 'fer',
+        'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT': 'grants',
+    }
+    # columns with many repeated values, dictionary encoded in the Parquet files
+    dictionary_columns = ('Application No.', 'pincode', 'Publication Date', 'Date of Filing')
+
+    def __init__(self, path, page_workers=1, chunks_per_worker=4, use_page_store=True, streaming=False,
+                 batch_size=1000, table_workers=1, table_engines=None, output_format='csv', parquet_directory=None,
+                 sqlite_path=None, use_manifest=False, checkpoint_pages=None, output_directory=None):
+        """
+        Parameters
+        ----------
+        path: Path or ArchivePath
+            The directory of the date, containing the pdf directory. It may be inside a ZIP archive created by
+            other/zip.py, e.g. ArchivePath('files/001.zip', '001'), in which case the PDF files are read straight
+            from the archive.
+        page_workers: int, optional
+            The number of processes used to parse the invention pages of a PDF. The default is 1 (sequential).
+        chunks_per_worker: int, optional
+            The number of page chunks per worker in which each PDF is split. The default is 4.
+        use_page_store: bool, optional
+            If True, the text of the pages is read from the page text store next to the pdf directory, which keeps
+            every page once it has been extracted. PDFs inside ZIP archives are always read with pdftotext, so
+            nothing is written next to them. The default is True.
+        streaming: bool, optional
+            If True, the PDFs are opened only while they are processed and the records are written in batches,
+            so that the memory used does not grow with the size of the journal. The default is False.
+        batch_size: int, optional
+            The number of records per written batch in streaming mode. The default is 1000.
+        table_workers: int, optional
+            The number of processes used to extract the tables of the FER and grant sections. The default is 1.
+        table_engines: dict, optional
+            The table engine of each table category: 'pdfplumber' (the default) or 'layout', which splits the
+            pdftotext layout text by column offsets and falls back to pdfplumber when its column check fails.
+        output_format: str, optional
+            'csv' (the default) to write CSV files in the csv directory of the date, 'parquet' to write
+            compressed Parquet datasets partitioned by year, publication date and category, or 'sqlite' to upsert
+            the records into an indexed SQLite database, in one transaction per date. The SQLite rows of a date are
+            kept in memory until that transaction, also in streaming mode.
+        parquet_directory: Path, optional
+            The root of the Parquet datasets. The default is a parquet directory next to the year directories.
+        sqlite_path: Path, optional
+            The SQLite database. The default is ipindia.sqlite next to the year directories.
+        use_manifest: bool, optional
+            If True, the manifest of the date records the hashes of the PDF files, the parser version and the
+            exported categories. A date whose PDF files and parser version did not change is skipped before opening
+            any PDF, and only the categories whose inputs changed are exported again, replacing their outputs.
+            Otherwise, the outputs that already exist are skipped. The default is False.
+        checkpoint_pages: int, optional
+            If given, the invention pages are parsed in chunks of about this number of pages, and the records of
+            every chunk are saved in the checkpoints directory of the date. After a crash, the next run loads the
+            saved chunks and parses only the unfinished ones. The default is None (no checkpoints).
+        output_directory: Path, optional
+            The directory where the outputs, the manifest and the checkpoints of the date are written. The default
+            is the directory of the date or, inside a ZIP archive, the directory where it would be extracted.
+        """
         self.path = path
+        self.page_workers = page_workers
+        self.chunks_per_worker = chunks_per_worker
+        self.use_page_store = use_page_store
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self.table_workers = table_workers
+        self.table_engines = table_engines or {}
+        if output_format not in ('csv', 'parquet', 'sqlite'):
+            raise ValueError(f'Unknown output format {output_format}')
+        self.output_format = output_format
+        if output_directory is None:
+            output_directory = path.extraction_path() if isinstance(path, ArchivePath) else path
+        self.output_directory = output_directory
+        self.parquet_directory = parquet_directory or self.output_directory.parent.parent / 'parquet'
+        self.sqlite_path = sqlite_path or self.output_directory.parent.parent / 'ipindia.sqlite'
         self.pdf_directory = self.path / 'pdf'
-        self.csv_directory = self.path / 'csv'
-        self.csv_directory.mkdir(exist_ok=True)
-        self.pdfs_paths = PDFSorter(self.pdf_directory).sort_pdf_files()
-        self.pdf_files = [load_pdf(path) for path in self.pdfs_paths]
-        self.contents_page = self._find_contents_page()
-        self.boundary_pages_per_category = self._find_boundaries_pages_per_category()
-        self.categories = self._find_categories()
-        self.boundary_pages_in_all_pdfs = self._find_boundary_pages_in_all_pdfs()
+        self.csv_directory = self.output_directory / 'csv'
+        self.manifest = DateManifest(self.output_directory, self.pdf_directory) if use_manifest else None
+        self.checkpoint_pages = checkpoint_pages
+        self.checkpoints = ChunkCheckpoints(self.output_directory, self.pdf_hash) if checkpoint_pages else None
+        self.sessions = []
+        self.sqlite_store = None
+        self.completed_categories = []
+        self._pdf_hashes = {}
+        if self.manifest is not None and self.manifest.is_complete(output_format):
+            print(f'{path} is unchanged since its last export')
+            self.categories = self.manifest.categories
+            self.pending_categories = []
+            return
+        if output_format == 'csv':
+            self.csv_directory.mkdir(parents=True, exist_ok=True)
+        with metrics.stage('prepare', date=path.name) as stage:
+            self.pdfs_paths = PDFSorter(self.pdf_directory).sort_pdf_files()
+            if streaming:
+                self.page_indices = []
+            else:
+                self.sessions = [self._open_session(i) for i in range(len(self.pdfs_paths))]
+                self.page_indices = [PageNumberIndex(session.text) for session in self.sessions]
+            self.contents_page = self._find_contents_page()
+            self.boundary_pages_per_category = self._find_boundaries_pages_per_category()
+            self.categories = self._find_categories()
+            self.boundary_pages_in_all_pdfs = self._find_boundary_pages_in_all_pdfs()
+            self.pending_categories = self._find_pending_categories()
+            stage.add(records=len(self.pdfs_paths))
+        if output_format == 'sqlite':
+            self.sqlite_store = SQLiteStore(self.sqlite_path)
 
     def export_data(self):
+        if self.manifest is not None:
+            for category in self.pending_categories:
+                self._remove_outputs(category)
+        with metrics.stage('export', date=self.path.name), self.date_transaction():
+            for category in self.invention_categories:
+                if category not in self.pending_categories:
+                    continue
+                print(f'Exporting {category}', end='\n' * 2)
+                self.export_invent_category(category)
+                print()
+            self.export_table_categories([category for category in self.table_categories
+                                          if category in self.pending_categories])
+        self.close()
+
+    @contextmanager
+    def date_transaction(self):
+        """
+        With the SQLite output, the records of the date are kept in memory while it is parsed, and then written in
+        one transaction, replacing the rows of a previous run of the exported categories. The write lock of the
+        database is only held while the rows are written, so the processes of other dates keep parsing meanwhile.
+        Nothing is written if the export fails.
+        The categories completed inside it are recorded in the manifest once their rows are committed.
+        """
+        try:
+            yield
+        except BaseException:
+            if self.sqlite_store is not None:
+                self.sqlite_store.discard_pending()
+            raise
+        if self.sqlite_store is not None:
+            n_rows = self.sqlite_store.write_pending(self.path.name, self.pending_categories)
+            print(f'Successful export of {n_rows} rows to {self.sqlite_store.path}')
+            if self.manifest is not None:
+                for category in self.completed_categories:
+                    self._mark_category_done(category)
+
+    def _complete_category(self, category):
+        """
+        Records that a category is exported. The CSV and Parquet files of the category are already written, so it is
+        marked as done in the manifest right away, and a later failure of the date does not export it again. The
+        SQLite rows are only written at the end of the date transaction, which marks them.
+        """
+        self.completed_categories.append(category)
+        if self.manifest is not None and self.output_format != 'sqlite':
+            self._mark_category_done(category)
 
-        for category in ['EARLY PUBLICATION', 'PUBLICATION AFTER 18 MONTHS']:
-            if category not in self.categories:
-                continue
-            print(f'Exporting {category}', end='\n' * 2)
-            self.export_invent_category(category)
-            print()
-        for category in ['WEEKLY ISSUED FER', 'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT']:
-            if category not in self.categories:
-                continue
-            print(f'Exporting {category}', end='\n' * 2)
-            self.export_table_category(category)
-            print()
+    def _mark_category_done(self, category):
+        self.manifest.mark_category_done(category, self.output_format, self._category_pdf_names(category),
+                                         self._output_paths(category))
 
     def export_table_category(self, category):
+        self.export_table_categories([category])
+
+    def export_table_categories(self, categories):
+        """
+        Exports the given table categories in one pass over the PDFs: every PDF is opened once with pdfplumber
+        and all the categories it contains are extracted from the same document session.
+        """
+        categories = [category for category in categories if category in self.categories]
+        pdf_indices_per_category = {}
+        for category in categories:
+            pdf_indices = self._gather_pdf_indices_in_category(category)
+            if len(pdf_indices) == 0:
+                raise ValueError(f'No PDFs gathered for {category}')
+            pdf_indices_per_category[category] = pdf_indices
+        all_pdf_indices = sorted(set().union(*pdf_indices_per_category.values()))
+        for i in all_pdf_indices:
+            with self.open_part(i) as part:
+                for category in categories:
+                    if i in pdf_indices_per_category[category]:
+                        print(f'Exporting {category}', end='\n' * 2)
+                        self._export_table_from_pdf(category, i, part)
+                        print()
+                        if i == pdf_indices_per_category[category][-1]:
+                            self._complete_category(category)
+
+    def _export_table_from_pdf(self, category, pdf_index, part):
         category_boundaries = self.boundary_pages_per_category[category]
-        pdf_indices = self._gather_pdf_indices_in_category(category)
-        if len(pdf_indices) == 0:
-            raise ValueError(f'No PDFs gathered for {category}')
-        for i in pdf_indices:
-            pdf_boundaries = self.boundary_pages_in_all_pdfs[i]
-            extraction_start, extraction_end = self._compute_extraction_boundaries(category_boundaries, pdf_boundaries)
-            pdf = self.pdf_files[i]
-            pdf_path = self.pdfs_paths[i]
-            first_index = self.get_first_index(pdf, extraction_start)
-            last_index = self.get_last_index(pdf, extraction_end)
-            if category == 'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT':
-                df = process_data(pdf_path, first_index, last_index, correct_serial_number=True)
-            else:
-                df = process_data(pdf_path, first_index, last_index)
-            target_path = self.csv_directory / f'{category}.csv'
-            if target_path.exists():
-                print(f'{target_path} already exists')
-            else:
-                print(f'Successful export {target_path}')
-                df.to_csv(self.csv_directory / f'{category}.csv', index=False)
+        pdf_boundaries = self.boundary_pages_in_all_pdfs[pdf_index]
+        extraction_start, extraction_end = self._compute_extraction_boundaries(category_boundaries, pdf_boundaries)
+        pdf_path = self.pdfs_paths[pdf_index]
+        session, page_index = part
+        with metrics.stage('table_export', category=category, pdf=pdf_path.name) as stage:
+            first_index = self.get_first_index(page_index, extraction_start)
+            last_index = self.get_last_index(page_index, extraction_end)
+            correct_serial_number = category == 'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT'
+            df = None
+            if self.table_engines.get(category, 'pdfplumber') == 'layout':
+                try:
+                    df = process_layout_data(session.layout, first_index, last_index, correct_serial_number)
+                except LayoutTableError as error:
+                    print(f'Layout engine failed ({error}), falling back to pdfplumber')
+            if df is None:
+                df = process_data(pdf_path, first_index, last_index, correct_serial_number, session,
+                                  self.table_workers)
+            self._write_table(category, df)
+            stage.add(records=len(df))
+
+    def _write_table(self, category, df):
+        if self.output_format != 'csv':
+            with self._create_writer(self.table_datasets[category], category, df.columns) as writer:
+                writer.write_many(df.itertuples(index=False, name=None))
+            return
+        target_path = self.csv_directory / f'{category}.csv'
+        if target_path.exists():
+            print(f'{target_path} already exists')
+        else:
+            print(f'Successful export {target_path}')
+            df.to_csv(self.csv_directory / f'{category}.csv', index=False)
+
+    def _create_writer(self, dataset, category, columns, batch_size=None):
+        if self.output_format == 'sqlite':
+            return SQLiteBatchWriter(self.sqlite_store, dataset, self.path.name, category, columns, batch_size)
+        destination_path = self._destination_path(dataset, category)
+        if self.output_format == 'parquet':
+            return ParquetBatchWriter(destination_path, columns, batch_size, self.dictionary_columns)
+        return CsvBatchWriter(destination_path, columns, batch_size)
+
+    def _destination_path(self, dataset, category):
+        """
+        The file of a dataset of an invention category, for the CSV and Parquet outputs.
+        """
+        if self.output_format == 'parquet':
+            return partition_path(self.parquet_directory, dataset, self.path.name, category)
+        return self.csv_directory / category / f'{dataset}.csv'
+
+    def _output_paths(self, category):
+        """
+        The files written for a category. The SQLite output has no files of its own.
+        """
+        if self.output_format == 'sqlite':
+            return []
+        if category in self.table_datasets:
+            if self.output_format == 'parquet':
+                return [partition_path(self.parquet_directory, self.table_datasets[category], self.path.name,
+                                       category)]
+            return [self.csv_directory / f'{category}.csv']
+        return [self._destination_path(name, category)
+                for name in ('applications', 'applicant_names', 'inventor_names')]
+
+    def _remove_outputs(self, category):
+        for output_path in self._output_paths(category):
+            if output_path.exists():
+                print(f'Removing outdated {output_path}')
+                output_path.unlink()
+
+    def close(self):
+        """
+        Closes the document sessions of all the PDFs and the SQLite store.
+        """
+        for session in self.sessions:
+            session.close()
+        if self.sqlite_store is not None:
+            self.sqlite_store.close()
+
+    @contextmanager
+    def open_part(self, pdf_index):
+        """
+        Gives the document session and the page-number index of a PDF. In streaming mode, the PDF is opened on
+        demand and closed when the block finishes; otherwise, the session kept by the processor is used.
+        """
+        if not self.streaming:
+            yield self.sessions[pdf_index], self.page_indices[pdf_index]
+            return
+        with self._open_session(pdf_index) as session:
+            yield session, PageNumberIndex(session.text)
+
+    def _open_session(self, pdf_index):
+        """
+        Creates the document session of a PDF, naming its page text store after the hash known by the processor.
+        """
+        pdf_path = self.pdfs_paths[pdf_index]
+        content_hash = self.pdf_hash(pdf_path) if uses_page_store(pdf_path, self.use_page_store) else None
+        return DocumentSession(pdf_path, self.use_page_store, content_hash)
+
+    def pdf_hash(self, pdf_path):
+        """
+        The SHA-256 hash of a PDF file of the date, computed at most once per processor and shared by the page text
+        store and the checkpoints. With the manifest, the hash it recorded is reused if the file did not change.
+        """
+        if pdf_path not in self._pdf_hashes:
+            content_hash = self.manifest.pdf_hashes().get(pdf_path.name) if self.manifest is not None else None
+            self._pdf_hashes[pdf_path] = content_hash or file_sha256(pdf_path)
+        return self._pdf_hashes[pdf_path]
 
     @staticmethod
-    def get_first_index(pdf, extraction_start):
-        index = 0
-        for page in pdf:
-            page_number = PdfPage(page).get_page_number(as_int=True)
-            if extraction_start <= page_number:
-                return index
-            index += 1
-        raise ValueError('No first index')
+    def get_first_index(page_index, extraction_start):
+        try:
+            return page_index.first_index_from(extraction_start)
+        except ValueError:
+            raise ValueError('No first index')
 
     @staticmethod
-    def get_last_index(pdf, extraction_end):
-        index = 0
-        for page in pdf:
-            page_number = PdfPage(page).get_page_number(as_int=True)
-            if extraction_end <= page_number:
-                return index
-            index += 1
-        raise ValueError('No last index')
+    def get_last_index(page_index, extraction_end):
+        try:
+            return page_index.first_index_from(extraction_end)
+        except ValueError:
+            raise ValueError('No last index')
 
     def export_invent_category(self, category):
-        datasets = self.produce_datasets(category)
         names = ('applications', 'applicant_names', 'inventor_names')
-        category_directory = self.csv_directory / category
-        category_directory.mkdir(exist_ok=True)
-        for name, dataset in zip(names, datasets):
-            df = pd.DataFrame(dataset)
-            df.replace('NA', '', inplace=True)
-            destination_path = category_directory / f'{name}.csv'
-            if destination_path.exists():
-                print(f'{destination_path} already exists')
-                continue
-            df.to_csv(destination_path, index=False)
-            print(f'Successful export {destination_path}')
+        if self.output_format == 'csv':
+            (self.csv_directory / category).mkdir(exist_ok=True)
+        if self.output_format != 'sqlite':
+            # the SQLite rows are upserted, so only the file outputs are skipped when they exist
+            destination_paths = [self._destination_path(name, category) for name in names]
+            if all(path.exists() for path in destination_paths):
+                for path in destination_paths:
+                    print(f'{path} already exists')
+                self._complete_category(category)
+                return
+        with ExitStack() as stack:
+            stage = stack.enter_context(metrics.stage('invention_parsing', category=category))
+            if self.streaming:
+                record_batches = self.iter_record_batches(category)
+                batch_size = self.batch_size
+            else:
+                record_batches = [self.produce_datasets(category)]
+                batch_size = None
+            record_columns = (ApplicationRecord.columns, PersonRecord.columns, PersonRecord.columns)
+            writers = [stack.enter_context(self._create_writer(name, category, columns, batch_size))
+                       for name, columns in zip(names, record_columns)]
+            for record_batch in record_batches:
+                for writer, records in zip(writers, record_batch):
+                    writer.write_many(records)
+                stage.add(records=len(record_batch[0]))
+        if self.checkpoints is not None:
+            self.checkpoints.clear(category)
+        self._complete_category(category)
 
     def produce_datasets(self, category):
-        category_boundaries = self.boundary_pages_per_category[category]
-        pdf_indices = self._gather_pdf_indices_in_category(category)
         applications_in_category = []
         applicant_names_in_category = []
         inventor_names_in_category = []
+        for applications, applicant_names, inventor_names in self.iter_record_batches(category):
+            applications_in_category.extend(applications)
+            applicant_names_in_category.extend(applicant_names)
+            inventor_names_in_category.extend(inventor_names)
+        return applications_in_category, applicant_names_in_category, inventor_names_in_category
+
+    def iter_record_batches(self, category):
+        """
+        Lazily yields the (applications, applicant names, inventor names) of the category, in page order,
+        one page at a time in the sequential path and one page chunk at a time in the page-parallel path.
+        """
+        category_boundaries = self.boundary_pages_per_category[category]
+        pdf_indices = self._gather_pdf_indices_in_category(category)
         for i in pdf_indices:
             pdf_boundaries = self.boundary_pages_in_all_pdfs[i]
             extraction_start, extraction_end = self._compute_extraction_boundaries(category_boundaries, pdf_boundaries)
-            pdf = self.pdf_files[i]
-            for page in pdf:
-                if not is_invention_page(page):
+            with self.open_part(i) as (session, page_index):
+                first_index, last_index = page_index.index_range(extraction_start, extraction_end)
+                metrics.add(pages=last_index - first_index)
+                if self.checkpoints is not None:
+                    yield from self._parse_pdf_with_checkpoints(category, session, i, first_index, last_index,
+                                                                extraction_start, extraction_end)
                     continue
-                invention_page = InventionPage(page)
-                page_number = invention_page.get_page_number(as_int=True)
-                if extraction_start <= page_number <= extraction_end:
-                    applications_in_category.append(invention_page.extract_application())
-                    applicant_names_in_category.extend(invention_page.extract_applicant_names())
-                    inventor_names_in_category.extend(invention_page.extract_inventor_names())
-        return applications_in_category, applicant_names_in_category, inventor_names_in_category
+                if self.page_workers > 1:
+                    yield from self._parse_pdf_in_parallel(session, i, first_index, last_index, extraction_start,
+                                                           extraction_end)
+                    continue
+                page_range = range(first_index, last_index)
+                for invention_page in iter_invention_pages(session.text, page_range, extraction_start, extraction_end):
+                    yield ([invention_page.extract_application()],
+                           invention_page.extract_applicant_names(),
+                           invention_page.extract_inventor_names())
+
+    def _parse_pdf_in_parallel(self, session, pdf_index, first_index, last_index, extraction_start, extraction_end):
+        """
+        Splits the pages of a PDF between first_index and last_index into chunks and parses them in worker processes.
+        The results are returned in page order, so they match the sequential path.
+        """
+        pdf_path = self.pdfs_paths[pdf_index]
+        chunks = split_range(first_index, last_index, self.page_workers * self.chunks_per_worker)
+        first_indices = [first for first, _ in chunks]
+        last_indices = [last for _, last in chunks]
+        n_chunks = len(chunks)
+        with ProcessPoolExecutor(max_workers=self.page_workers) as executor:
+            yield from metrics.merged(executor.map(parse_invention_chunk,
+                                                   [pdf_path] * n_chunks,
+                                                   first_indices,
+                                                   last_indices,
+                                                   [extraction_start] * n_chunks,
+                                                   [extraction_end] * n_chunks,
+                                                   [self._store_paths(session)] * n_chunks,
+                                                   [metrics.current_labels()] * n_chunks))
+
+    def _parse_pdf_with_checkpoints(self, category, session, pdf_index, first_index, last_index, extraction_start,
+                                    extraction_end):
+        """
+        Parses the pages of a PDF between first_index and last_index in chunks of checkpoint_pages pages, in
+        page order. The chunks saved by a previous run are loaded instead of parsed; the other ones are parsed,
+        in worker processes if page_workers > 1, and saved as soon as they are finished.
+        """
+        pdf_path = self.pdfs_paths[pdf_index]
+        n_chunks = -(-(last_index - first_index) // self.checkpoint_pages)
+        chunks = split_range(first_index, last_index, n_chunks)
+        pending_chunks = [chunk for chunk in chunks
+                          if not self.checkpoints.exists(category, pdf_path, chunk, extraction_start, extraction_end)]
+        if len(pending_chunks) < len(chunks):
+            print(f'Resuming {pdf_path.name}: {len(chunks) - len(pending_chunks)} of {len(chunks)} chunks '
+                  f'loaded from checkpoints')
+        with ExitStack() as stack:
+            if self.page_workers > 1 and len(pending_chunks) > 1:
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=self.page_workers))
+                n_pending = len(pending_chunks)
+                parsed_chunks = metrics.merged(executor.map(parse_invention_chunk,
+                                                            [pdf_path] * n_pending,
+                                                            [first for first, _ in pending_chunks],
+                                                            [last for _, last in pending_chunks],
+                                                            [extraction_start] * n_pending,
+                                                            [extraction_end] * n_pending,
+                                                            [self._store_paths(session)] * n_pending,
+                                                            [metrics.current_labels()] * n_pending))
+            else:
+                parsed_chunks = (extract_invention_records(session.text, range(first, last), extraction_start,
+                                                           extraction_end)
+                                 for first, last in pending_chunks)
+            pending_chunks = set(pending_chunks)
+            for chunk in chunks:
+                if chunk not in pending_chunks:
+                    yield self.checkpoints.load(category, pdf_path, chunk, extraction_start, extraction_end)
+                    continue
+                records = next(parsed_chunks)
+                self.checkpoints.save(category, pdf_path, chunk, extraction_start, extraction_end, records)
+                yield records
+
+    @staticmethod
+    def _store_paths(session):
+        """
+        The files of the page text store of a session, passed to the page-chunk workers, or None without a store.
+        The pages the session extracted are flushed first, so the workers find them in the store.
+        """
+        if not isinstance(session.text, PageTextStore):
+            return None
+        session.text.flush()
+        return session.text.data_path, session.text.index_path
 
     # ------------------------------
     # Preparation methods
@@ -150,10 +547,10 @@ class DateProcessor:
         return pdf_indices
 
     def _find_contents_page(self):
-        first_pdf = self.pdf_files[0]
-        for i, page in enumerate(first_pdf):
-            if is_contents_page(page):
-                return Contents(self.pdfs_paths[0], i)
+        with self.open_part(0) as (session, _):
+            for i, page in enumerate(session.text):
+                if is_contents_page(page):
+                    return Contents(self.pdfs_paths[0], i, session=session)
         raise ValueError('No contents page found in the first pdf file')
 
     def _find_categories(self):
@@ -162,12 +559,36 @@ class DateProcessor:
     def _find_boundaries_pages_per_category(self):
         return self.contents_page.get_limits()
 
+    def _find_pending_categories(self):
+        """
+        The exported categories of the journal, except the ones the manifest records as exported from the current
+        PDF files with the current parser version.
+        """
+        categories = [category for category in self.invention_categories + self.table_categories
+                      if category in self.categories]
+        if self.manifest is None:
+            return categories
+        self.manifest.set_categories(categories)
+        pending_categories = []
+        for category in categories:
+            if self.manifest.is_category_done(category, self.output_format, self._category_pdf_names(category)):
+                print(f'{category} is unchanged since its last export')
+            else:
+                pending_categories.append(category)
+        return pending_categories
+
+    def _category_pdf_names(self, category):
+        """
+        The PDF files a category is extracted from, including the first one, whose contents page gives its limits.
+        """
+        pdf_indices = {0, *self._gather_pdf_indices_in_category(category)}
+        return [self.pdfs_paths[i].name for i in sorted(pdf_indices)]
+
     def _find_boundary_pages_in_all_pdfs(self):
         result = []
-        for pdf in self.pdf_files:
-            boundary_pages = [pdf[0], pdf[-1]]
-            boundary_page_numbers = [PdfPage(page).get_page_number() for page in boundary_pages]
-            result.append(tuple(boundary_page_numbers))
+        for i in range(len(self.pdfs_paths)):
+            with self.open_part(i) as (_, page_index):
+                result.append((page_index.page_number(0), page_index.page_number(-1)))
         return result
 
     @staticmethod
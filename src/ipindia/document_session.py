@@ -0,0 +1,149 @@
+"""
+Implements the DocumentSession class, which shares the backends opened on a PDF file among the processing stages.
+"""
+from contextlib import contextmanager
+
+import camelot
+import pdfplumber
+
+from ipindia.archive import ArchivePath, local_copy
+from ipindia.metrics import metrics
+from ipindia.page_store import PageTextStore, as_path, load_pages, read_pdf, uses_page_store
+
+
+def open_plumber(pdf_path):
+    """
+    Opens a PDF file with pdfplumber. A PDF file inside a ZIP archive is read from a stream over the archive, which
+    is closed along with the PDF.
+    """
+    if isinstance(pdf_path, ArchivePath):
+        return pdfplumber.PDF(pdf_path.open('rb'), stream_is_external=False)
+    return pdfplumber.open(pdf_path)
+
+
+def release_page(page):
+    """
+    Frees the layout objects cached by pdfplumber for the page.
+    """
+    if hasattr(page, 'close'):
+        page.close()
+    else:
+        page.flush_cache()
+
+
+class DocumentSession:
+    """
+    A class to open each backend (pdftotext, pdfplumber and camelot) at most once per PDF file.
+    The backends are opened lazily, and the parsed pages and tables are cached until the session is closed,
+    so the contents, invention and table stages of a date do not parse the same file several times.
+    """
+
+    def __init__(self, pdf_path, use_page_store=True, content_hash=None):
+        """
+        Parameters
+        ----------
+        pdf_path: Path or ArchivePath
+            The PDF file, which may be inside a ZIP archive.
+        use_page_store: bool, optional
+            If True, the text of the pages is read from the page text store, except for a PDF inside a ZIP archive.
+            The default is True.
+        content_hash: str, optional
+            The SHA-256 hash of the PDF file, which names its page text store, when it is already known. By default,
+            it is computed when the store is opened.
+        """
+        self.pdf_path = pdf_path
+        self.use_page_store = use_page_store
+        self.content_hash = content_hash
+        self._text = None
+        self._layout = None
+        self._plumber = None
+        self._tables = {}
+        self._camelot_tables = {}
+
+    @property
+    def text(self):
+        """
+        The text content of the pages, as a pdftotext.PDF or a PageTextStore object.
+        """
+        if self._text is None:
+            use_page_store = uses_page_store(self.pdf_path, self.use_page_store)
+            with self._text_extraction('page_store' if use_page_store else 'pdftotext') as stage:
+                self._text = load_pages(self.pdf_path, use_page_store, self.content_hash)
+                stage.add(pages=len(self._text))
+        return self._text
+
+    @property
+    def layout(self):
+        """
+        The text content of the pages keeping their physical layout, as with `pdftotext -layout`.
+        """
+        if self._layout is None:
+            with self._text_extraction('pdftotext_layout') as stage:
+                self._layout = read_pdf(self.pdf_path, physical=True)
+                stage.add(pages=len(self._layout))
+        return self._layout
+
+    @contextmanager
+    def _text_extraction(self, engine):
+        """
+        Measures the extraction of the text of the pages with the given engine, which reads the whole PDF file.
+        """
+        pdf_path = as_path(self.pdf_path)
+        with metrics.stage('text_extraction', pdf=pdf_path.name, engine=engine) as stage:
+            stage.add(bytes_read=pdf_path.stat().st_size)
+            yield stage
+
+    @property
+    def plumber(self):
+        """
+        The PDF file opened with pdfplumber. Its pages keep their parsed layout objects while the session is open.
+        """
+        if self._plumber is None:
+            self._plumber = open_plumber(self.pdf_path)
+        return self._plumber
+
+    def plumber_page(self, index):
+        return self.plumber.pages[index]
+
+    def extract_table(self, index):
+        """
+        Returns the table of the page at the given index, extracted with pdfplumber.
+        """
+        if index not in self._tables:
+            self._tables[index] = self.plumber_page(index).extract_table()
+        return self._tables[index]
+
+    def release_page(self, index):
+        """
+        Frees the layout objects of the page at the given index. Its extracted table stays cached.
+        """
+        if self._plumber is not None:
+            release_page(self._plumber.pages[index])
+
+    def read_camelot(self, pages, **kwargs):
+        """
+        Returns the tables of the given pages (with camelot's 1-based notation), extracted with camelot.
+        Camelot only reads files from disk, so a PDF inside a ZIP archive is copied to a temporary file for it.
+        """
+        key = (pages, repr(sorted(kwargs.items())))
+        if key not in self._camelot_tables:
+            with local_copy(self.pdf_path) as pdf_path:
+                self._camelot_tables[key] = camelot.read_pdf(pdf_path, pages=pages, **kwargs)
+        return self._camelot_tables[key]
+
+    def close(self):
+        if self._plumber is not None:
+            self._plumber.close()
+            self._plumber = None
+        if isinstance(self._text, PageTextStore):
+            self._text.close()
+        self._text = None
+        self._layout = None
+        self._tables.clear()
+        self._camelot_tables.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
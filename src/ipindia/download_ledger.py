@@ -0,0 +1,109 @@
+"""
+Implements the DownloadLedger class, which records the size and hash of the PDF files downloaded for a date, and
+the checks used to tell complete downloads from truncated ones.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+from ipindia.page_store import file_sha256
+
+
+class IncompleteDownloadError(ValueError):
+    """
+    Raised when a downloaded file is truncated or is not a PDF file.
+    """
+
+
+def is_valid_pdf(path, trailer_size=1024):
+    """
+    Checks the structure of a PDF file: it must start with the %PDF- header and end with the %%EOF marker,
+    which a truncated download lacks.
+    """
+    size = path.stat().st_size
+    if size < len(b'%PDF-'):
+        return False
+    with open(path, 'rb') as file:
+        if file.read(5) != b'%PDF-':
+            return False
+        file.seek(max(0, size - trailer_size))
+        return b'%%EOF' in file.read()
+
+
+class DownloadLedger:
+    """
+    Class to record the PDF files downloaded for a date, with their size, modification time and SHA-256 hash, in a
+    JSON file in the directory of the date. A file is complete if it is recorded, its size did not change, it passes
+    the PDF structure check and, if it was modified since it was recorded, its hash did not change. Files downloaded
+    before the ledger existed are recorded the first time they are checked.
+    The ledger can be used from several threads, e.g. the ones the concurrent HTTP downloader checks files in.
+    """
+    file_name = 'downloads.json'
+
+    def __init__(self, date_directory):
+        """
+        Parameters
+        ----------
+        date_directory: Path
+            The directory of the date, containing the pdf directory.
+        """
+        self.pdf_directory = date_directory / 'pdf'
+        self.path = date_directory / self.file_name
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as file:
+                self.files = json.load(file)
+        else:
+            self.files = {}
+        self._lock = threading.Lock()
+
+    def is_complete(self, file_name):
+        """
+        Checks whether a file of the date was completely downloaded.
+        """
+        pdf_path = self.pdf_directory / file_name
+        if not pdf_path.exists() or not is_valid_pdf(pdf_path):
+            return False
+        entry = self.files.get(file_name)
+        if entry is None:
+            self.record(file_name)
+            return True
+        stat = pdf_path.stat()
+        if entry['size'] != stat.st_size:
+            return False
+        if entry.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+        if file_sha256(pdf_path) != entry['sha256']:
+            return False
+        with self._lock:
+            entry['mtime_ns'] = stat.st_mtime_ns
+            self.save()
+        return True
+
+    def record(self, file_name, expected_size=None):
+        """
+        Checks a downloaded file and records its size and hash.
+
+        Raises
+        ------
+        IncompleteDownloadError
+            If the file does not have the expected size or is not a valid PDF file.
+        """
+        pdf_path = self.pdf_directory / file_name
+        stat = pdf_path.stat()
+        size = stat.st_size
+        if expected_size is not None and size != expected_size:
+            raise IncompleteDownloadError(f'{pdf_path} has {size} bytes instead of {expected_size}')
+        if not is_valid_pdf(pdf_path):
+            raise IncompleteDownloadError(f'{pdf_path} is not a complete PDF file')
+        entry = {'size': size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(pdf_path),
+                 'downloaded_at': datetime.now().isoformat(timespec='seconds')}
+        with self._lock:
+            self.files[file_name] = entry
+            self.save()
+
+    def save(self):
+        temporary_path = self.path.with_name(f'{self.file_name}.tmp')
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(self.files, file, indent=2, ensure_ascii=False)
+        os.replace(temporary_path, self.path)
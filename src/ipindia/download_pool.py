@@ -0,0 +1,224 @@
+"""
+Implements the DownloadPool class, which downloads the records of the IPIndia journal table with several browser
+sessions running in parallel.
+"""
+import json
+import multiprocessing
+import queue
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from ipindia.downloader_driver import DownloaderDriver
+
+
+def run_worker(worker_id, downloads_directory, tasks, results, download_timeout, done_dates=()):
+    """
+    Worker process of the pool. It downloads the record numbers taken from its tasks queue with its own browser
+    session, until it receives None, and reports the outcome of every record to the results queue.
+    The records whose publication date is in done_dates are skipped.
+    The browser is started again after a failure, since the session may be broken.
+    """
+    worker_directory = Path(downloads_directory) / f'.worker-{worker_id}'
+    downloader = None
+    while True:
+        record_number = tasks.get()
+        if record_number is None:
+            break
+        try:
+            if downloader is None:
+                downloader = DownloaderDriver(path_downloads_directory=downloads_directory,
+                                              download_timeout=download_timeout, worker_directory=worker_directory)
+                downloader.visit_ipindia()
+            publication_date = downloader.download_record_number(record_number, done_dates)
+        except Exception as error:
+            results.put((worker_id, record_number, 'error', f'{type(error).__name__}: {error}'))
+            if downloader is not None:
+                downloader.driver.quit()
+                downloader = None
+        else:
+            results.put((worker_id, record_number, 'done', publication_date))
+    if downloader is not None:
+        downloader.driver.quit()
+
+
+class DownloadPool:
+    """
+    Class to download a range of records of the journal table with a pool of isolated browser sessions.
+
+    Every worker is a process with its own browser profile and download directory. The record numbers are sent to
+    the workers one at a time, failed records are sent again up to max_retries times, and the outcome of every
+    record is appended to a progress file, keyed by publication date, so that a restart skips the journals already
+    downloaded even if new journals shifted the rows of the table. A worker that dies is replaced, and its record
+    is sent again as a failure.
+    """
+    poll_seconds = 5
+
+    def __init__(self, first_record=1, last_record=878, path_downloads_directory=None, n_workers=4, max_retries=3,
+                 download_timeout=600, progress_path=None):
+        """
+        Parameters
+        ----------
+        first_record: int, optional
+            The first record to download. The default is 1.
+        last_record: int, optional
+            The last record to download. The default is 878.
+        path_downloads_directory: str or Path
+            The directory where the date directories are created.
+        n_workers: int, optional
+            The number of browser sessions. The default is 4.
+        max_retries: int, optional
+            The number of times a failed record is tried again. The default is 3.
+        download_timeout: int, optional
+            The seconds to wait for a file to download before giving up. The default is 600.
+        progress_path: str or Path, optional
+            The progress file, with one JSON line per finished record. The default is download_progress.jsonl
+            in the downloads directory.
+        """
+        self.first_record = first_record
+        self.last_record = last_record
+        self.downloads_directory = Path(path_downloads_directory)
+        self.n_workers = n_workers
+        self.max_retries = max_retries
+        self.download_timeout = download_timeout
+        self.progress_path = Path(progress_path) if progress_path else \
+            self.downloads_directory / 'download_progress.jsonl'
+        self.downloads_directory.mkdir(parents=True, exist_ok=True)
+        self.done_dates = set()
+        self.pending_records = deque()
+        self.attempts = {}
+        self.assigned_records = {}
+        self.idle_workers = []
+        self.failed_records = {}
+        self.results = None
+        self.workers = {}
+        self.task_queues = {}
+
+    def download_records(self):
+        """
+        Main method. Downloads the records whose publication date is not recorded as done in the progress file.
+
+        Returns
+        -------
+        dict
+            The record numbers that failed after all the retries, with their last error.
+        """
+        self.done_dates = self.read_done_dates()
+        self.pending_records = deque(range(self.first_record, self.last_record + 1))
+        print(f'Downloading {len(self.pending_records)} records with {self.n_workers} workers '
+              f'({len(self.done_dates)} journals already done)')
+        if not self.pending_records:
+            return {}
+        self.attempts = dict.fromkeys(self.pending_records, 0)
+        self.assigned_records = {}
+        self.failed_records = {}
+        self.results = multiprocessing.Queue()
+        for worker_id in range(min(self.n_workers, len(self.pending_records))):
+            self._start_worker(worker_id)
+        self.idle_workers = list(self.workers)
+        try:
+            self._dispatch()
+            while self.assigned_records:
+                try:
+                    worker_id, record_number, status, detail = self.results.get(timeout=self.poll_seconds)
+                except queue.Empty:
+                    self._replace_dead_workers()
+                    continue
+                if self.assigned_records.get(worker_id) != record_number:
+                    # the outcome of a record already sent again after its worker was found dead
+                    continue
+                del self.assigned_records[worker_id]
+                self.idle_workers.append(worker_id)
+                if status == 'done':
+                    print(f'Worker {worker_id}: record {record_number} ({detail}) done')
+                    if detail not in self.done_dates:
+                        self.done_dates.add(detail)
+                        self.record_progress('done', publication_date=detail, record=record_number)
+                else:
+                    self._fail(worker_id, record_number, detail)
+                self._dispatch()
+        finally:
+            for worker_id in self.workers:
+                self.task_queues[worker_id].put(None)
+            for worker in self.workers.values():
+                worker.join()
+        print('Done!')
+        return self.failed_records
+
+    def _dispatch(self):
+        """
+        Sends a pending record to every idle worker, while there are pending records.
+        """
+        while self.idle_workers and self.pending_records:
+            worker_id = self.idle_workers.pop()
+            self.assigned_records[worker_id] = self.pending_records.popleft()
+            self.task_queues[worker_id].put(self.assigned_records[worker_id])
+
+    def _fail(self, worker_id, record_number, detail):
+        """
+        Queues a failed record again or, after max_retries retries, records it as failed.
+        """
+        if self.attempts[record_number] < self.max_retries:
+            self.attempts[record_number] += 1
+            print(f'Worker {worker_id}: record {record_number} failed ({detail}), '
+                  f'retry {self.attempts[record_number]} of {self.max_retries}')
+            self.pending_records.append(record_number)
+        else:
+            print(f'Worker {worker_id}: record {record_number} failed ({detail})')
+            self.record_progress('failed', record=record_number, error=detail)
+            self.failed_records[record_number] = detail
+
+    def _replace_dead_workers(self):
+        """
+        Starts a new process for every worker that died while downloading a record, which fails and is queued again.
+        """
+        for worker_id, record_number in list(self.assigned_records.items()):
+            worker = self.workers[worker_id]
+            if worker.is_alive():
+                continue
+            del self.assigned_records[worker_id]
+            self._fail(worker_id, record_number, f'the worker stopped with exit code {worker.exitcode}')
+            self._start_worker(worker_id)
+            self.idle_workers.append(worker_id)
+        self._dispatch()
+
+    def _start_worker(self, worker_id):
+        """
+        Starts the process of a worker, with its own tasks queue, replacing the previous process with the same id.
+        """
+        self.task_queues[worker_id] = multiprocessing.Queue()
+        self.workers[worker_id] = multiprocessing.Process(
+            target=run_worker, args=(worker_id, str(self.downloads_directory), self.task_queues[worker_id],
+                                     self.results, self.download_timeout, frozenset(self.done_dates)))
+        self.workers[worker_id].start()
+
+    def read_done_dates(self):
+        """
+        Returns the publication dates recorded as done in the progress file.
+        """
+        done_dates = set()
+        if not self.progress_path.exists():
+            return done_dates
+        with open(self.progress_path, encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                publication_date = entry.get('publication_date')
+                if publication_date is None:
+                    continue
+                if entry['status'] == 'done':
+                    done_dates.add(publication_date)
+                else:
+                    done_dates.discard(publication_date)
+        return done_dates
+
+    def record_progress(self, status, **details):
+        entry = {'status': status, 'time': datetime.now().isoformat(timespec='seconds'), **details}
+        with open(self.progress_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry) + '\n')
+
+
+if __name__ == '__main__':
+    pool = DownloadPool(first_record=1, last_record=20, path_downloads_directory='files', n_workers=4)
+    print(pool.download_records())
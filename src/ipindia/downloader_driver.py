@@ -1,6 +1,9 @@
 """
 This script implements a class which handle the logic to download all the PDF files from the IPIndia website.
 """
+import os
+import shutil
+import tempfile
 import time
 from datetime import datetime
 from pathlib import Path
@@ -10,6 +13,9 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 
+from ipindia.download_ledger import DownloadLedger, IncompleteDownloadError, is_valid_pdf
+from ipindia.metrics import metrics
+
 
 class DownloaderDriver:
     """
@@ -17,8 +23,10 @@ class DownloaderDriver:
     It handles the download of all the PDF files.
     """
     url_ipindia = 'https://search.ipindia.gov.in/IPOJournal/Journal/Patent'
+    partial_suffixes = ('.crdownload', '.tmp')
 
-    def __init__(self, first_record=1, last_record=878, path_downloads_directory=None):
+    def __init__(self, first_record=1, last_record=878, path_downloads_directory=None, download_timeout=600,
+                 worker_directory=None, max_retries=3, backoff=5):
         """
         Parameters
         ----------
@@ -26,14 +34,34 @@ class DownloaderDriver:
             The first record to download. The default is 1.
         last_record: int, optional
             The last record to download. The default is 878.
+        download_timeout: int, optional
+            The seconds to wait for a file to download before giving up. The default is 600.
+        worker_directory: str or Path, optional
+            A directory, inside the downloads directory, for the browser profile and the temporary downloads of
+            this driver, so that several drivers can run at the same time. By default, the browser uses a
+            temporary profile and the files are downloaded directly inside the downloads directory.
+        max_retries: int, optional
+            The number of times a file is downloaded again when it times out or is not a complete PDF file.
+            The default is 3.
+        backoff: int, optional
+            The seconds to wait before the first retry. The wait doubles with every retry. The default is 5.
         """
         self.path_downloads_directory = path_downloads_directory
         self.downloads_directory = Path(self.path_downloads_directory)
-        self.driver = webdriver.Chrome(options=self.prepare_options())
         self.first_record = first_record
         self.last_record = last_record
+        self.download_timeout = download_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
         if not self.downloads_directory.exists():
             self.downloads_directory.mkdir()
+        self.worker_directory = Path(worker_directory) if worker_directory is not None else None
+        if self.worker_directory is not None:
+            self.temporary_directory = self.worker_directory / 'downloads'
+            self.temporary_directory.mkdir(parents=True, exist_ok=True)
+        else:
+            self.temporary_directory = self.downloads_directory
+        self.driver = webdriver.Chrome(options=self.prepare_options())
 
     def download_records(self):
         """
@@ -53,64 +81,130 @@ class DownloaderDriver:
         print('Done!')
         self.driver.quit()
 
+    def download_record_number(self, record_number, done_dates=()):
+        """
+        Downloads the record in the given row of the table, counting from 1, and returns its publication date.
+        The rows of the table shift when a journal is published, so the records are identified by their
+        publication date: the ones in done_dates, or whose directory is complete, are skipped.
+        """
+        table_records = self.driver.find_elements(By.CSS_SELECTOR, 'tbody>tr')
+        if not 1 <= record_number <= len(table_records):
+            raise IndexError(f'There is no record {record_number} in the table')
+        record = table_records[record_number - 1]
+        publication_date = self.read_publication_date(record)
+        if publication_date in done_dates:
+            print(f'Row {publication_date} already done')
+            return publication_date
+        try:
+            self._download_record(record)
+        except FileExistsError:
+            pass
+        return publication_date
+
+    def read_publication_date(self, record):
+        date_element = record.find_element(By.CSS_SELECTOR, 'td:nth-child(3)')
+        return self._format_date(date_element.text.strip())
+
     def _download_record(self, record):
         """
         Detects the serial number of the record, creates a directory for the record, and downloads its PDFs.
+        The PDFs of the record that were already completely downloaded are skipped.
 
         Parameters
         ----------
         record : WebElement
             The WebElement containing the record to be downloaded.
         """
-        date_element = record.find_element(By.CSS_SELECTOR, 'td:nth-child(3)')
-        publication_date = self._format_date(date_element.text.strip())
+        publication_date = self.read_publication_date(record)
         print(f'Current row: {publication_date}\n')
-        record_directory = self.prepare_record_directory(publication_date)
         pdf_links = record.find_elements(By.XPATH, './/td[last()]//button[@type="submit"]')
-        for pdf_counter, pdf_element in enumerate(pdf_links, start=1):
-            print(f'File number {pdf_counter}\n')
-            self.process_pdf_element(pdf_element, record_directory)
-            print('-' * 30 + '\n')
+        file_names = [f'{pdf_element.text.strip()}.pdf' for pdf_element in pdf_links]
+        # one ledger per record, shared with the methods below, so that no stale copy overwrites its entries
+        ledger = DownloadLedger(self.downloads_directory / publication_date)
+        record_directory = self.prepare_record_directory(publication_date, file_names, ledger)
+        with metrics.stage('download_record', date=publication_date) as stage:
+            for pdf_counter, (pdf_element, file_name) in enumerate(zip(pdf_links, file_names), start=1):
+                print(f'File number {pdf_counter}\n')
+                if ledger.is_complete(file_name):
+                    print(f'{file_name} already downloaded')
+                    continue
+                self.process_pdf_element(pdf_element, record_directory, ledger)
+                stage.add(records=1)
+                print('-' * 30 + '\n')
+        return publication_date
 
-    def prepare_record_directory(self, date: str):
+    def prepare_record_directory(self, date: str, file_names=None, ledger=None):
         """
         Creates the directory for the given record through its serial number.
+        An existing directory is only considered complete if all the PDF files of the record (by default, all the
+        PDF files in it) were completely downloaded, according to the given ledger of the date (by default, the one
+        in its directory). Otherwise, the missing and truncated files are downloaded again.
+
         Raises
         ------
         FileExistsError
-            If the directory for the given serial number already exists.
+            If the directory for the given serial number already exists and it is complete.
         """
         directory = self.downloads_directory / date / 'pdf'
         if directory.exists():
-            print(f'Row {date} already exists')
-            raise FileExistsError
+            if ledger is None:
+                ledger = DownloadLedger(directory.parent)
+            if file_names is None:
+                file_names = [pdf_file.name for pdf_file in directory.glob('*.pdf')]
+            if file_names and all(ledger.is_complete(file_name) for file_name in file_names):
+                print(f'Row {date} already exists')
+                raise FileExistsError
+            print(f'Row {date} is incomplete, downloading the missing files')
         else:
             directory.mkdir(parents=True)
         return directory
 
-    @staticmethod
-    def show_waiting_time(path_download):
+    @classmethod
+    def wait_for_download(cls, directory, timeout=600, poll_interval=0.1, settle_time=0.3):
         """
-        Show the waiting time for a file to download.
+        Waits for a download to finish in a directory used only by that download.
+
+        Chrome writes the file as a .crdownload partial file and renames it when it is complete, so the download
+        is finished when the directory contains a single file, it is not a partial file and its size does not
+        change for settle_time seconds. The directory is checked every poll_interval seconds.
 
         Parameters
         ----------
-        path_download : str or pathlib.Path
-            The path of the file which is expected to be downloaded.
+        directory : pathlib.Path
+            The download directory.
+        timeout : int, optional
+            The seconds to wait before giving up. The default is 600.
 
+        Returns
+        ----------
+        pdf_file : Path
+            The downloaded file.
+
+        Raises
+        ------
+        TimeoutError
+            If the download does not finish in time.
         """
         print('Waiting for file to download...')
-        time_waited = 0
-        while not path_download.exists():
-            extra_time = 5
-            print(f'Total time waited: {time_waited} seconds')
-            print(f'We will wait {extra_time} more seconds')
-            time_waited += extra_time
-            time.sleep(extra_time)
+        start = time.monotonic()
+        last_size = None
+        stable_since = None
+        while time.monotonic() - start < timeout:
+            files = list(directory.iterdir())
+            if len(files) == 1 and files[0].suffix not in cls.partial_suffixes:
+                size = files[0].stat().st_size
+                now = time.monotonic()
+                if size != last_size:
+                    last_size, stable_since = size, now
+                elif size > 0 and now - stable_since >= settle_time:
+                    print(f'Total time waited: {now - start:.1f} seconds')
+                    return files[0]
+            time.sleep(poll_interval)
+        raise TimeoutError(f'The download to {directory} did not finish in {timeout} seconds')
 
     def download_pdf(self, download_element):
         """
-        Download a PDF file.
+        Download a PDF file into a new temporary directory, so that it cannot be confused with other downloads.
 
         Parameters
         ----------
@@ -120,16 +214,22 @@ class DownloaderDriver:
         Returns
         ----------
         pdf_file : Path
-            The path to the downloaded PDF file.
+            The path to the downloaded PDF file, inside its temporary directory.
 
         """
+        download_directory = Path(tempfile.mkdtemp(prefix='.download-', dir=self.temporary_directory))
+        self.driver.execute_cdp_cmd('Page.setDownloadBehavior',
+                                    {'behavior': 'allow', 'downloadPath': str(download_directory.resolve())})
         download_element.click()
-        pdf_file = self.downloads_directory / 'ViewJournal.pdf'
-        self.show_waiting_time(pdf_file)
+        try:
+            pdf_file = self.wait_for_download(download_directory, self.download_timeout)
+        except TimeoutError:
+            shutil.rmtree(download_directory, ignore_errors=True)
+            raise
         print('\nSuccess: file downloaded')
         return pdf_file
 
-    def process_pdf_element(self, element, directory):
+    def process_pdf_element(self, element, directory, ledger=None):
         """
         Get the name of the PDF file, download it and move it to the specified directory.
 
@@ -141,12 +241,36 @@ class DownloaderDriver:
         directory : Path
             The directory where the downloaded PDF file will be saved.
 
+        ledger : DownloadLedger, optional
+            The ledger of the date, where the downloaded file is recorded. By default, the one in its directory.
+
         """
         file_name = element.text.strip()
         print(f'File name: {file_name}')
-        pdf_file = self.download_pdf(element)
         new_file_path = directory / f'{file_name}.pdf'
-        pdf_file.rename(new_file_path)
+        with metrics.stage('download', date=directory.parent.name, file=file_name) as stage:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    # every attempt is measured, so the failed ones are counted as errors
+                    with metrics.stage('download_attempt', attempt=attempt + 1):
+                        pdf_file = self.download_pdf(element)
+                        if not is_valid_pdf(pdf_file):
+                            shutil.rmtree(pdf_file.parent)
+                            raise IncompleteDownloadError(f'{file_name} is not a complete PDF file')
+                    break
+                except (TimeoutError, IncompleteDownloadError) as error:
+                    if attempt == self.max_retries:
+                        raise
+                    waiting_time = self.backoff * 2 ** attempt
+                    print(f'{error}. Trying again in {waiting_time} seconds')
+                    time.sleep(waiting_time)
+            # the temporary directory is inside the downloads directory, so the file is moved atomically
+            os.replace(pdf_file, new_file_path)
+            pdf_file.parent.rmdir()
+            if ledger is None:
+                ledger = DownloadLedger(directory.parent)
+            ledger.record(new_file_path.name)
+            stage.add(records=1, bytes_read=new_file_path.stat().st_size)
 
     def visit_ipindia(self):
         """
@@ -174,8 +298,10 @@ class DownloaderDriver:
         chrome_options.add_argument('--verbose')
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--disable-software-rasterizer')
+        if self.worker_directory is not None:
+            chrome_options.add_argument(f'--user-data-dir={(self.worker_directory / "profile").resolve()}')
         chrome_options.add_experimental_option("prefs", {
-            "download.default_directory": self.path_downloads_directory,
+            "download.default_directory": str(self.temporary_directory.resolve()),
             "download.prompt_for_download": False,
             "download.directory_upgrade": True,
             "safebrowsing_for_trusted_sources_enabled": False,
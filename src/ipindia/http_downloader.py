@@ -0,0 +1,307 @@
+"""
+This script implements a class which downloads the PDF files from the IPIndia website with concurrent HTTP requests,
+replaying the forms of the journal table instead of clicking them in a browser.
+"""
+import asyncio
+import os
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urljoin
+
+import aiohttp
+
+from ipindia.download_ledger import DownloadLedger, IncompleteDownloadError
+
+
+class JournalFile:
+    """
+    A PDF file of the journal table: the form that must be submitted to download it.
+    """
+    __slots__ = ('publication_date', 'file_name', 'url', 'method', 'form_data')
+
+    def __init__(self, publication_date, file_name, url, method, form_data):
+        self.publication_date = publication_date
+        self.file_name = file_name
+        self.url = url
+        self.method = method
+        self.form_data = form_data
+
+    def __repr__(self):
+        return f'JournalFile({self.publication_date!r}, {self.file_name!r})'
+
+
+class JournalTableParser(HTMLParser):
+    """
+    Parses the rows of the journal table: the text of their cells and the forms of their last cell, with their
+    fields and submit buttons.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._in_body = False
+        self._row = None
+        self._cell = None
+        self._form = None
+        self._button = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'tbody':
+            self._in_body = True
+        elif not self._in_body:
+            return
+        elif tag == 'tr':
+            self._row = {'cells': [], 'forms': []}
+        elif tag == 'td' and self._row is not None:
+            self._cell = []
+            # only the forms of the last cell, which has the download buttons, are kept
+            self._row['forms'] = []
+        elif tag == 'form' and self._row is not None:
+            self._form = {'action': attrs.get('action') or '', 'method': (attrs.get('method') or 'get').upper(),
+                          'fields': {}, 'buttons': []}
+            self._row['forms'].append(self._form)
+        elif tag == 'input' and self._form is not None:
+            input_type = (attrs.get('type') or 'text').lower()
+            if input_type == 'submit':
+                self._form['buttons'].append({'name': attrs.get('name'), 'value': attrs.get('value') or '',
+                                              'text': attrs.get('value') or ''})
+            elif attrs.get('name'):
+                self._form['fields'][attrs['name']] = attrs.get('value') or ''
+        elif tag == 'button' and self._form is not None and (attrs.get('type') or 'submit').lower() == 'submit':
+            self._button = {'name': attrs.get('name'), 'value': attrs.get('value') or '', 'text': ''}
+            self._form['buttons'].append(self._button)
+
+    def handle_endtag(self, tag):
+        if tag == 'tbody':
+            self._in_body = False
+        elif tag == 'button':
+            self._button = None
+        elif tag == 'form':
+            self._form = None
+        elif tag == 'td' and self._cell is not None:
+            self._row['cells'].append(' '.join(''.join(self._cell).split()))
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+        if self._button is not None:
+            self._button['text'] += data
+
+
+def parse_journal_table(html, base_url):
+    """
+    Returns the files of every row of the journal table, as a list of lists of JournalFile.
+
+    Parameters
+    ----------
+    html: str
+        The HTML of the page with the journal table.
+    base_url: str
+        The URL of the page, used to resolve the actions of the forms.
+    """
+    parser = JournalTableParser()
+    parser.feed(html)
+    parser.close()
+    records = []
+    for row in parser.rows:
+        if len(row['cells']) < 3:
+            continue
+        publication_date = datetime.strptime(row['cells'][2], '%d/%m/%Y').strftime('%Y-%m-%d')
+        files = []
+        for form in row['forms']:
+            for button in form['buttons']:
+                form_data = dict(form['fields'])
+                if button['name']:
+                    form_data[button['name']] = button['value']
+                files.append(JournalFile(publication_date, button['text'].strip(), urljoin(base_url, form['action']),
+                                         form['method'], form_data))
+        records.append(files)
+    return records
+
+
+class HttpDownloader:
+    """
+    Class to download the PDF files of the journal table with an HTTP client.
+    The table is parsed from the HTML of the page, and the form of every file is submitted directly, over a pool
+    of keep-alive connections, with a bounded number of downloads running concurrently.
+    The files are saved with the same layout as DownloaderDriver: <date>/pdf/<file name>.pdf.
+
+    Every file is checked (size, PDF structure) and recorded in the download ledger of its date. Failed downloads
+    are retried with exponential backoff, resuming the partial file with an HTTP Range request when the server
+    supports it.
+    """
+    url_ipindia = 'https://search.ipindia.gov.in/IPOJournal/Journal/Patent'
+
+    def __init__(self, first_record=1, last_record=878, path_downloads_directory=None, base_url=None,
+                 max_concurrency=4, timeout=600, chunk_size=1 << 16, max_retries=3, backoff=5):
+        """
+        Parameters
+        ----------
+        first_record: int, optional
+            The first record to download. The default is 1.
+        last_record: int, optional
+            The last record to download. The default is 878.
+        path_downloads_directory: str or Path
+            The directory where the date directories are created.
+        base_url: str, optional
+            The URL of the page with the journal table. The default is the IPIndia journal page.
+        max_concurrency: int, optional
+            The maximum number of files downloaded at the same time. The default is 4.
+        timeout: int, optional
+            The seconds after which a download is abandoned. The default is 600.
+        chunk_size: int, optional
+            The number of bytes written at once. The default is 64 KiB.
+        max_retries: int, optional
+            The number of times a failed download is tried again. The default is 3.
+        backoff: int, optional
+            The seconds to wait before the first retry. The wait doubles with every retry. The default is 5.
+        """
+        self.first_record = first_record
+        self.last_record = last_record
+        self.downloads_directory = Path(path_downloads_directory)
+        self.base_url = base_url or self.url_ipindia
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.ledgers = {}
+        self.downloads_directory.mkdir(parents=True, exist_ok=True)
+
+    def download_records(self):
+        """
+        Main method. Downloads the files of the records between first_record and last_record.
+
+        Returns
+        -------
+        list of Path
+            The downloaded files. The files that could not be downloaded are reported and left out.
+        """
+        return asyncio.run(self.download_records_async())
+
+    async def download_records_async(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            html = await self.fetch_table(session)
+            records = parse_journal_table(html, self.base_url)[self.first_record - 1:self.last_record]
+            files = [journal_file for record in records for journal_file in record]
+            print(f'Downloading {len(files)} files of {len(records)} records')
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            results = await asyncio.gather(*(self._download_with_semaphore(session, semaphore, journal_file)
+                                             for journal_file in files), return_exceptions=True)
+        downloaded = []
+        for journal_file, result in zip(files, results):
+            if isinstance(result, Exception):
+                print(f'Failed: {journal_file.publication_date} {journal_file.file_name} ({result!r})')
+            elif result is not None:
+                downloaded.append(result)
+        print('Done!')
+        return downloaded
+
+    async def fetch_table(self, session):
+        async with session.get(self.base_url) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    async def _download_with_semaphore(self, session, semaphore, journal_file):
+        async with semaphore:
+            return await self.download_file(session, journal_file)
+
+    async def download_file(self, session, journal_file):
+        """
+        Submits the form of a file and streams the response to a partial file, which is moved to its destination
+        when it is complete and recorded in the ledger. Files already completely downloaded are skipped.
+        The file writes and the checks of the ledger run in threads, so the event loop keeps serving the other
+        downloads meanwhile.
+
+        Returns
+        -------
+        Path or None
+            The downloaded file, or None if it was already downloaded.
+        """
+        directory = self.prepare_record_directory(journal_file.publication_date)
+        ledger = self.get_ledger(directory.parent)
+        destination_path = directory / f'{journal_file.file_name}.pdf'
+        if await asyncio.to_thread(ledger.is_complete, destination_path.name):
+            print(f'{destination_path} already exists')
+            return None
+        partial_path = destination_path.with_name(f'{destination_path.name}.part')
+        for attempt in range(self.max_retries + 1):
+            try:
+                expected_size = await self._fetch(session, journal_file, partial_path)
+                os.replace(partial_path, destination_path)
+                try:
+                    await asyncio.to_thread(ledger.record, destination_path.name, expected_size)
+                except IncompleteDownloadError:
+                    destination_path.unlink()
+                    raise
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError, IncompleteDownloadError) as error:
+                if attempt == self.max_retries:
+                    raise
+                waiting_time = self.backoff * 2 ** attempt
+                print(f'{destination_path}: {error!r}. Trying again in {waiting_time} seconds')
+                await asyncio.sleep(waiting_time)
+        print(f'Success: {destination_path}')
+        return destination_path
+
+    async def _fetch(self, session, journal_file, partial_path):
+        """
+        Streams a file to its partial file. If a previous attempt left a partial file, only the remaining bytes are
+        requested; the partial file is written again from the start if the server ignores the Range header.
+
+        Returns
+        -------
+        int or None
+            The size of the complete file given by the server, if any.
+        """
+        request_options = {'data': journal_file.form_data} if journal_file.method == 'POST' else \
+            {'params': journal_file.form_data}
+        resume_from = partial_path.stat().st_size if partial_path.exists() else 0
+        headers = {'Range': f'bytes={resume_from}-'} if resume_from else {}
+        async with session.request(journal_file.method, journal_file.url, headers=headers,
+                                   **request_options) as response:
+            if response.status == 416:
+                # the range starts after the end of the file, so the partial file is not a prefix of it
+                partial_path.unlink()
+                raise IncompleteDownloadError(f'{partial_path} does not match the file in the server')
+            response.raise_for_status()
+            if response.status == 206:
+                mode = 'ab'
+                expected_size = self._total_size(response.headers.get('Content-Range'))
+            else:
+                mode = 'wb'
+                expected_size = response.content_length
+            with open(partial_path, mode) as file:
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    await asyncio.to_thread(file.write, chunk)
+        return expected_size
+
+    @staticmethod
+    def _total_size(content_range):
+        # e.g. 'bytes 1000-4999/5000'
+        if content_range is None or content_range.endswith('/*'):
+            return None
+        return int(content_range.rsplit('/', 1)[1])
+
+    def get_ledger(self, date_directory):
+        if date_directory not in self.ledgers:
+            self.ledgers[date_directory] = DownloadLedger(date_directory)
+        return self.ledgers[date_directory]
+
+    def prepare_record_directory(self, date):
+        directory = self.downloads_directory / date / 'pdf'
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+
+if __name__ == '__main__':
+    downloader = HttpDownloader(first_record=1, last_record=5, path_downloads_directory='files')
+    downloader.download_records()
@@ -0,0 +1,126 @@
+"""
+Implements the DateManifest class, which records what has been exported for a date, so that unchanged work is
+skipped and only the categories whose inputs or parsing code changed are exported again.
+"""
+import json
+import os
+from datetime import datetime
+
+from ipindia.page_store import file_sha256
+
+# Version of the parsing code. It must be increased whenever a change in the parsing modifies the exported data,
+# so that the categories exported with a previous version are exported again.
+PARSER_VERSION = '1'
+
+
+class DateManifest:
+    """
+    Class to read and write the manifest of a date, a JSON file in the directory of the date with:
+
+    - the SHA-256 hash of every PDF file, along with its size and modification time, so that a file is hashed
+      again only when it changes;
+    - the categories found in the contents page, and the hashes of the PDF files they were found in;
+    - for every exported category, the parser version, the output format, the hashes of the PDF files it was
+      extracted from and the files it was written to.
+    """
+    file_name = 'manifest.json'
+
+    def __init__(self, date_directory, pdf_directory=None):
+        """
+        Parameters
+        ----------
+        date_directory: Path
+            The directory of the date, where the manifest and the outputs are written.
+        pdf_directory: Path or ArchivePath, optional
+            The directory of the PDF files, which may be inside a ZIP archive. The default is the pdf directory of
+            the date directory.
+        """
+        self.date_directory = date_directory
+        self.pdf_directory = pdf_directory if pdf_directory is not None else date_directory / 'pdf'
+        self.path = date_directory / self.file_name
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        else:
+            data = {}
+        self.pdfs = data.get('pdfs', {})
+        self.categories = data.get('categories')
+        self.categories_inputs = data.get('categories_inputs', {})
+        self.completed = data.get('completed', {})
+        self._hashes = None
+
+    def pdf_hashes(self):
+        """
+        Returns the hash of every PDF file of the date, by file name. Only new or modified files are hashed.
+        """
+        if self._hashes is None:
+            pdfs = {}
+            for pdf_path in sorted(self.pdf_directory.glob('*.pdf')):
+                stat = pdf_path.stat()
+                entry = self.pdfs.get(pdf_path.name)
+                if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                    entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(pdf_path)}
+                pdfs[pdf_path.name] = entry
+            self.pdfs = pdfs
+            self._hashes = {name: entry['sha256'] for name, entry in pdfs.items()}
+        return self._hashes
+
+    def is_complete(self, output_format):
+        """
+        Checks, without opening the PDF files, whether all the categories of the date were exported from the
+        current PDF files, with the current parser version and in the given output format.
+        """
+        if self.categories is None or self.categories_inputs != self.pdf_hashes():
+            return False
+        return all(self.is_category_done(category, output_format) for category in self.categories)
+
+    def is_category_done(self, category, output_format, pdf_names=None):
+        """
+        Checks whether a category was exported from the current content of the given PDF files (by default, the
+        ones it was exported from), with the current parser version and in the given output format.
+        """
+        state = self.completed.get(category)
+        if state is None:
+            return False
+        if state['parser_version'] != PARSER_VERSION or state['output_format'] != output_format:
+            return False
+        if pdf_names is None:
+            pdf_names = state['inputs']
+        hashes = self.pdf_hashes()
+        if state['inputs'] != {name: hashes.get(name) for name in pdf_names}:
+            return False
+        return all((self.date_directory / output).exists() for output in state['outputs'])
+
+    def mark_category_done(self, category, output_format, pdf_names, outputs):
+        """
+        Records that a category was exported from the given PDF files to the given output files, and saves the
+        manifest.
+        """
+        hashes = self.pdf_hashes()
+        self.completed[category] = {
+            'parser_version': PARSER_VERSION,
+            'output_format': output_format,
+            'inputs': {name: hashes[name] for name in pdf_names},
+            'outputs': [os.path.relpath(output, self.date_directory) for output in outputs],
+            'completed_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.save()
+
+    def set_categories(self, categories):
+        """
+        Records the categories found in the contents page of the current PDF files, and saves the manifest.
+        """
+        self.categories = list(categories)
+        self.categories_inputs = dict(self.pdf_hashes())
+        self.save()
+
+    def save(self):
+        """
+        Writes the manifest to a temporary file and moves it to its place, so that it is never left half written.
+        """
+        data = {'pdfs': self.pdfs, 'categories': self.categories, 'categories_inputs': self.categories_inputs,
+                'completed': self.completed}
+        temporary_path = self.path.with_name(f'{self.file_name}.tmp')
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2, ensure_ascii=False)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,233 @@
+"""
+Implements the Metrics class, which measures the processing stages (wall and CPU time, pages, records and bytes
+read), logs every run of a stage as a JSON line and writes the totals as a Prometheus textfile.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger('ipindia.metrics')
+
+
+class StageRun:
+    """
+    The measurements of a run of a stage.
+    """
+    counters = ('pages', 'records', 'bytes_read')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.pages = 0
+        self.records = 0
+        self.bytes_read = 0
+        self.status = 'ok'
+
+    def add(self, pages=0, records=0, bytes_read=0):
+        self.pages += pages
+        self.records += records
+        self.bytes_read += bytes_read
+
+    def as_dict(self):
+        return {'time': datetime.now().isoformat(timespec='milliseconds'), 'pid': os.getpid(), 'stage': self.name,
+                **self.labels, 'status': self.status, 'seconds': round(self.seconds, 6),
+                'cpu_seconds': round(self.cpu_seconds, 6), 'pages': self.pages, 'records': self.records,
+                'bytes_read': self.bytes_read}
+
+
+class Metrics:
+    """
+    Class to record the runs of the processing stages.
+
+    A stage is measured with the stage context manager, and the code inside it adds the pages, records and bytes it
+    processes. Stages can be nested: a stage inherits the labels of the stage around it (e.g. the date and the
+    category), and the counters added with Metrics.add go to the innermost open stage of the thread.
+
+    Every run is logged as a JSON line by the ipindia.metrics logger (see log_json_lines). The runs are also added
+    up by stage and by the labels in aggregated_labels, whose values are few; the other labels (dates, file names)
+    are only in the log lines, so that the number of Prometheus series does not grow with the data.
+
+    The registry is local to the process. The tasks run in worker processes (e.g. the page chunks) are measured with
+    task, and return the snapshot of their metrics with their result, which the parent merges with merged.
+    """
+    aggregated_labels = ('category', 'engine')
+    prometheus_prefix = 'ipindia_stage'
+    prometheus_help = {
+        'runs': 'Number of runs of the stage.',
+        'errors': 'Number of runs of the stage that raised an error.',
+        'seconds': 'Wall time spent in the stage, in seconds.',
+        'cpu_seconds': 'CPU time of the process spent in the stage, in seconds.',
+        'pages': 'Number of PDF pages processed by the stage.',
+        'records': 'Number of records produced by the stage.',
+        'bytes_read': 'Number of bytes read by the stage.',
+    }
+
+    def __init__(self):
+        self.totals = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """
+        Measures the code inside the block as a run of the given stage. Labels with None values are ignored.
+
+        Yields
+        ------
+        StageRun
+            The run, to which the block adds its pages, records and bytes read.
+        """
+        stack = self._stack()
+        run_labels = dict(stack[-1].labels) if stack else {}
+        run_labels.update((label, str(value)) for label, value in labels.items() if value is not None)
+        run = StageRun(name, run_labels)
+        stack.append(run)
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield run
+        except BaseException:
+            run.status = 'error'
+            raise
+        finally:
+            run.seconds = time.perf_counter() - start
+            run.cpu_seconds = time.process_time() - cpu_start
+            stack.pop()
+            self._record(run)
+
+    @contextmanager
+    def task(self, name, **labels):
+        """
+        Measures a task run in a worker process as a run of the given stage. The totals and the open stages inherited
+        from the parent process (with the fork start method) or left by a previous task of the worker are cleared
+        first, so a snapshot taken after the block only contains the task.
+        """
+        self.reset()
+        self._stack().clear()
+        with self.stage(name, **labels) as run:
+            yield run
+
+    def merged(self, results):
+        """
+        Yields the results of worker tasks returned as (result, snapshot) pairs, merging their snapshots.
+        """
+        for result, snapshot in results:
+            self.merge(snapshot)
+            yield result
+
+    def current_labels(self):
+        """
+        Returns the labels of the innermost open stage of the thread, to be passed on to the tasks of the workers.
+        """
+        stack = self._stack()
+        return dict(stack[-1].labels) if stack else {}
+
+    def add(self, pages=0, records=0, bytes_read=0):
+        """
+        Adds counters to the innermost open stage of the thread. It does nothing outside of any stage.
+        """
+        stack = self._stack()
+        if stack:
+            stack[-1].add(pages, records, bytes_read)
+
+    def snapshot(self):
+        """
+        Returns the totals as a list of dictionaries, which can be sent between processes and merged.
+        """
+        with self._lock:
+            return [{'stage': stage, 'labels': dict(labels), **values}
+                    for (stage, labels), values in self.totals.items()]
+
+    def merge(self, snapshot):
+        """
+        Adds the totals of a snapshot, e.g. the one of a worker process.
+        """
+        with self._lock:
+            for entry in snapshot:
+                key = (entry['stage'], tuple(entry['labels'].items()))
+                values = self.totals.setdefault(key, dict.fromkeys(self.prometheus_help, 0))
+                for name in self.prometheus_help:
+                    values[name] += entry[name]
+
+    def reset(self):
+        with self._lock:
+            self.totals.clear()
+
+    def to_prometheus(self):
+        """
+        Returns the totals in the Prometheus text exposition format, as counters labelled by stage.
+        """
+        lines = []
+        with self._lock:
+            totals = sorted(self.totals.items())
+        for name, help_text in self.prometheus_help.items():
+            metric = f'{self.prometheus_prefix}_{name}_total'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for (stage, labels), values in totals:
+                label_text = ','.join(f'{label}="{escape_label_value(value)}"'
+                                      for label, value in (('stage', stage), *labels))
+                lines.append(f'{metric}{{{label_text}}} {values[name]!r}')
+        lines.append('# HELP ipindia_metrics_written_timestamp_seconds Time the metrics were written.')
+        lines.append('# TYPE ipindia_metrics_written_timestamp_seconds gauge')
+        lines.append(f'ipindia_metrics_written_timestamp_seconds {time.time():.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """
+        Writes the totals to a .prom file for the textfile collector of node_exporter. The file is replaced
+        atomically, so the collector never reads it half-written.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(f'{path.name}.tmp')
+        temporary_path.write_text(self.to_prometheus(), encoding='utf-8')
+        os.replace(temporary_path, path)
+
+    def _record(self, run):
+        labels = tuple((label, run.labels[label]) for label in self.aggregated_labels if label in run.labels)
+        with self._lock:
+            values = self.totals.setdefault((run.name, labels), dict.fromkeys(self.prometheus_help, 0))
+            values['runs'] += 1
+            values['errors'] += run.status == 'error'
+            values['seconds'] += run.seconds
+            values['cpu_seconds'] += run.cpu_seconds
+            for counter in StageRun.counters:
+                values[counter] += getattr(run, counter)
+        logger.info(json.dumps(run.as_dict(), ensure_ascii=False))
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def log_json_lines(path=None):
+    """
+    Sends the JSON log lines of the stages to a file, appending to it, or by default to the standard error.
+    Calling it again with the same file does not add another handler.
+    """
+    target = str(Path(path).resolve()) if path is not None else None
+    for handler in logger.handlers:
+        if getattr(handler, 'baseFilename', None) == target:
+            return handler
+    handler = logging.FileHandler(target, encoding='utf-8') if target else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return handler
+
+
+# the registry of the process, shared by all the instrumented classes
+metrics = Metrics()
@@ -0,0 +1,227 @@
+"""
+Implements the PageTextStore class, a persistent cache of the text content of the pages of a PDF file.
+"""
+import hashlib
+import mmap
+import os
+from array import array
+from pathlib import Path
+
+from pdftotext import PDF
+
+from ipindia.archive import ArchivePath
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 hash of the content of a file (also a ZIP archive member), reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with as_path(path).open('rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def as_path(path):
+    """
+    Returns the path as a Path if it is a string. Paths and ArchivePath objects are returned as they are.
+    """
+    return Path(path) if isinstance(path, str) else path
+
+
+def lock_file(file):
+    """
+    Locks an open file exclusively until it is closed. Without fcntl (on Windows), the file is not locked.
+    """
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+
+def uses_page_store(pdf_path, use_page_store=True):
+    """
+    Checks whether the pages of a PDF file are read from its page text store. A PDF inside a ZIP archive is always
+    read with pdftotext, so processing an archive writes nothing to disk.
+    """
+    return use_page_store and not isinstance(pdf_path, ArchivePath)
+
+
+def load_pages(pdf_path, use_page_store=True, content_hash=None):
+    """
+    Loads the text of the pages of a PDF file, from its page text store if use_page_store is True. The hash of the
+    PDF file names its store; it is computed if not given.
+    """
+    if uses_page_store(pdf_path, use_page_store):
+        return PageTextStore.load(pdf_path, content_hash=content_hash)
+    return read_pdf(pdf_path)
+
+
+def read_pdf(path, physical=False):
+    with as_path(path).open('rb') as file:
+        pdf = PDF(file, physical=physical)
+    return pdf
+
+
+class PageTextStore:
+    """
+    A class to read the text of the pages of a PDF file from disk, without decoding the PDF again.
+    The store is built lazily: a page is extracted with pdftotext the first time it is requested, and the pages
+    extracted during a session are appended to the store when it is flushed or closed. So only the pages the
+    processing stages actually read (e.g. the ones in the extraction range of a category) are ever extracted.
+    The text of the pages is stored in one append-only UTF-8 file, next to an index with the byte offset and length
+    of every page (-1 for the pages not extracted yet). The text file is memory-mapped, so any stored page can be
+    read without loading the rest.
+    It behaves like a pdftotext.PDF object: it supports len(), indexing (also negative) and iteration.
+    """
+    directory_name = 'page_text'
+
+    def __init__(self, pdf_path, data_path, index_path):
+        """
+        Parameters
+        ----------
+        pdf_path: Path
+            The PDF file, from which the pages missing in the store are extracted.
+        data_path: Path
+            The file with the text of the stored pages.
+        index_path: Path
+            The file with the byte offset and length of every page, as signed 64-bit integers.
+        """
+        self.pdf_path = pdf_path
+        self.data_path = data_path
+        self.index_path = index_path
+        self._pdf = None
+        self._file = None
+        self._data = b''
+        self._new_pages = {}
+        self.spans = self._read_index()
+        if self.spans is None:
+            self.spans = array('q', [-1]) * (2 * len(self.pdf))
+        else:
+            self._map_data()
+
+    @classmethod
+    def load(cls, pdf_path, directory=None, content_hash=None):
+        """
+        Main method. Returns the store of the given PDF file, which is created empty if it does not exist yet.
+
+        Parameters
+        ----------
+        pdf_path: Path
+            The PDF file.
+        directory: Path, optional
+            The directory of the stores. The default is a page_text directory next to the directory of the PDF.
+        content_hash: str, optional
+            The SHA-256 hash of the PDF file, when it is already known. By default, it is computed.
+        """
+        pdf_path = as_path(pdf_path)
+        return cls(pdf_path, *cls.store_paths(pdf_path, directory, content_hash))
+
+    @classmethod
+    def store_paths(cls, pdf_path, directory=None, content_hash=None):
+        """
+        Returns the data and index files of the store of a PDF file, which are named after the hash of its content.
+        """
+        pdf_path = as_path(pdf_path)
+        if directory is None:
+            directory = pdf_path.parent.parent / cls.directory_name
+        if content_hash is None:
+            content_hash = file_sha256(pdf_path)
+        return directory / f'{content_hash}.txt', directory / f'{content_hash}.spans'
+
+    @property
+    def pdf(self):
+        """
+        The PDF file opened with pdftotext, only when a page missing in the store is requested.
+        """
+        if self._pdf is None:
+            self._pdf = read_pdf(self.pdf_path)
+        return self._pdf
+
+    def flush(self):
+        """
+        Appends the pages extracted since the last flush to the store. The store may be shared by several processes
+        (e.g. the page-chunk workers), so the index is read again and merged under a lock of the data file. The text
+        is written before the index, which is moved into place atomically, so an interrupted flush never leaves an
+        index pointing to missing text.
+        """
+        if not self._new_pages:
+            return
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.data_path, 'ab') as file:
+            lock_file(file)
+            spans = self._read_index()
+            if spans is None:
+                # text left by an interrupted first flush is not referenced by any index
+                file.truncate(0)
+                spans = array('q', [-1]) * len(self.spans)
+            offset = file.seek(0, os.SEEK_END)
+            for index, text in sorted(self._new_pages.items()):
+                if spans[2 * index] >= 0:
+                    continue
+                length = file.write(text.encode('utf-8'))
+                spans[2 * index], spans[2 * index + 1] = offset, length
+                offset += length
+            file.flush()
+            index_tmp = self.index_path.with_name(f'{self.index_path.name}.tmp')
+            index_tmp.write_bytes(spans.tobytes())
+            os.replace(index_tmp, self.index_path)
+        self.spans = spans
+        self._new_pages.clear()
+        self._map_data()
+
+    def _read_index(self):
+        if not self.index_path.exists():
+            return None
+        spans = array('q')
+        spans.frombytes(self.index_path.read_bytes())
+        return spans
+
+    def _map_data(self):
+        self._close_data()
+        self._file = open(self.data_path, 'rb')
+        if os.fstat(self._file.fileno()).st_size > 0:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_data(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = b''
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return len(self.spans) // 2
+
+    def __getitem__(self, index):
+        n_pages = len(self)
+        if index < 0:
+            index += n_pages
+        if not 0 <= index < n_pages:
+            raise IndexError('Page index out of range')
+        offset, length = self.spans[2 * index], self.spans[2 * index + 1]
+        if offset >= 0:
+            return self._data[offset:offset + length].decode('utf-8')
+        if index not in self._new_pages:
+            self._new_pages[index] = self.pdf[index]
+        return self._new_pages[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        self.flush()
+        self._close_data()
+        self._pdf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -10,6 +10,7 @@ class PdfPage:
     It is intended to be inherited by other classes that represent specific PDF pages.
     """
     page_number_pattern = re.compile(r'(\d{1,})[a-zA-Z\s]*\Z')  # TODO: before \d{3,}
+    journal_header_pattern = re.compile(r'The Patent Office Journal(No.*Dated)?\s+\d{2}/\d{2}/\d{4}')
 
     def __init__(self, text):
         """
@@ -41,8 +42,15 @@ class PdfPage:
         -------
         str or int
         """
-        clean_text = re.sub(r'The Patent Office Journal(No.*Dated)?\s+\d{2}/\d{2}/\d{4}', '', self.text)
-        page_number_match = self.page_number_pattern.search(clean_text.strip())
+        return self.find_page_number(self.text, as_int)
+
+    @classmethod
+    def find_page_number(cls, text, as_int=False):
+        """
+        Finds the page number in the given text, which can be the whole page or just its footer.
+        """
+        clean_text = cls.journal_header_pattern.sub('', text)
+        page_number_match = cls.page_number_pattern.search(clean_text.strip())
         try:
             number = page_number_match.group(1)
             if as_int:
@@ -1,9 +1,11 @@
 import re
 
-import camelot
 #import numpy as np
 import pandas as pd
-import pdfplumber
+
+from ipindia.document_session import DocumentSession
+from ipindia.metrics import metrics
+from ipindia.page_store import as_path
 
 
 class Contents:
@@ -12,11 +14,17 @@ class Contents:
                   'WEEKLY ISSUED FER',
                   'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT']
 
-    def __init__(self, pdf_path, contents_index):
+    def __init__(self, pdf_path, contents_index, session=None):
         self.pdf_path = pdf_path
         self.contents_index = contents_index
-        self.df = self._build_df()
-        self._clean_df()
+        with metrics.stage('contents_parsing', pdf=as_path(pdf_path).name) as stage:
+            if session is None:
+                with DocumentSession(pdf_path) as own_session:
+                    self.df = self._build_df(own_session)
+            else:
+                self.df = self._build_df(session)
+            self._clean_df()
+            stage.add(pages=1, records=len(self.df))
 
     def get_limits(self):
         limits_mapping = dict.fromkeys(self.categories)
@@ -37,41 +45,37 @@ class Contents:
                 self.categories.remove(category)
         return limits_mapping
 
-    def _build_df(self):
-        with pdfplumber.open(self.pdf_path) as pdf:
-            pages = pdf.pages
-            contents = pages[self.contents_index]
-            table = contents.extract_table()
-            if table is None:
-                # table_settings = {'vertical_strategy': 'text',
-                #                   'horizontal_strategy': 'text'}
-                # table = contents.extract_table(table_settings=table_settings)
-                # df = pd.DataFrame(table[1:], columns=table[0])
-                # df['concatenada'] = df.apply(lambda row: ''.join(row.astype(str)), axis=1)
-                # df = df[['concatenada']]
-                # df.dropna(inplace=True)
-                # df = df['concatenada'].str.split(r':', expand=True)
-                # df = df.replace('', np.nan)
-                # df.dropna(inplace=True)
-                tables = camelot.read_pdf(str(self.pdf_path),
-                                          pages=str(self.contents_index + 1),
+    def _build_df(self, session):
+        table = session.extract_table(self.contents_index)
+        if table is None:
+            # table_settings = {'vertical_strategy': 'text',
+            #                   'horizontal_strategy': 'text'}
+            # table = contents.extract_table(table_settings=table_settings)
+            # df = pd.DataFrame(table[1:], columns=table[0])
+            # df['concatenada'] = df.apply(lambda row: ''.join(row.astype(str)), axis=1)
+            # df = df[['concatenada']]
+            # df.dropna(inplace=True)
+            # df = df['concatenada'].str.split(r':', expand=True)
+            # df = df.replace('', np.nan)
+            # df.dropna(inplace=True)
+            tables = session.read_camelot(str(self.contents_index + 1),
                                           table_areas=['50,700,600,100'],
                                           edge_tol=500,
                                           columns=['410'],
                                           row_tol=15,
                                           flavor='stream')
-                df = tables[0].df
-                subject_series = df[df.iloc[:, 0].str.contains('Subject', na=False, case=False)]
-                if subject_series.empty:
-                    subject_index = 0
-                else:
-                    subject_index = subject_series.index[0]
-                df = df[subject_index:]
-                df.columns = df.iloc[0]
-                df = df[1:]
+            df = tables[0].df
+            subject_series = df[df.iloc[:, 0].str.contains('Subject', na=False, case=False)]
+            if subject_series.empty:
+                subject_index = 0
             else:
-                df = pd.DataFrame(table[1:], columns=table[0])
-                assert len(df.columns) == 3, 'The number of columns is not 3'
+                subject_index = subject_series.index[0]
+            df = df[subject_index:]
+            df.columns = df.iloc[0]
+            df = df[1:]
+        else:
+            df = pd.DataFrame(table[1:], columns=table[0])
+            assert len(df.columns) == 3, 'The number of columns is not 3'
         return df
 
     def _clean_df(self):
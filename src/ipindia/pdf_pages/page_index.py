@@ -0,0 +1,108 @@
+"""
+Implements the PageNumberIndex class.
+"""
+from ipindia.pdf_pages.basic_page import PdfPage
+
+
+class PageNumberIndex:
+    """
+    A class to map the pages of a PDF to their printed page numbers.
+    Page numbers are read from the footer of the pages and cached, so each page is read at most once.
+    It relies on the page numbers increasing along the PDF, which lets it find offsets by binary search.
+    """
+    footer_size = 500
+
+    def __init__(self, pdf):
+        """
+        Parameters
+        ----------
+        pdf: pdftotext.PDF or sequence of str
+            The text content of the pages of the PDF.
+        """
+        self.pdf = pdf
+        self.n_pages = len(pdf)
+        self.page_numbers = {}
+
+    def __len__(self):
+        return self.n_pages
+
+    def page_number(self, index):
+        """
+        Returns the page number, as an integer, of the page at the given index.
+        """
+        if index < 0:
+            index += self.n_pages
+        if index not in self.page_numbers:
+            try:
+                self.page_numbers[index] = self.read_page_number(self.pdf[index])
+            except ValueError:
+                self.page_numbers[index] = None
+        page_number = self.page_numbers[index]
+        if page_number is None:
+            raise ValueError('Page number not found')
+        return page_number
+
+    def first_index_from(self, page_number):
+        """
+        Returns the index of the first page whose page number is greater than or equal to the given one.
+
+        Raises
+        ------
+        ValueError
+            If all the pages have a lower page number.
+        """
+        index = self._bisect_left(page_number)
+        if index == self.n_pages:
+            raise ValueError(f'No page numbered from {page_number}')
+        return index
+
+    def index_range(self, first_page_number, last_page_number):
+        """
+        Returns the (start, stop) indices of the pages whose page number is between the given ones, both included.
+        """
+        start = self._bisect_left(first_page_number)
+        stop = self._bisect_left(last_page_number + 1)
+        return start, max(start, stop)
+
+    @classmethod
+    def read_page_number(cls, text):
+        footer = cls.get_footer(text)
+        try:
+            return PdfPage.find_page_number(footer, as_int=True)
+        except ValueError:
+            return PdfPage.find_page_number(text, as_int=True)
+
+    @classmethod
+    def get_footer(cls, text):
+        """
+        Returns the last lines of the text, up to footer_size characters, without cutting any line.
+        """
+        if len(text) <= cls.footer_size:
+            return text
+        footer = text[-cls.footer_size:]
+        line_break = footer.find('\n')
+        if line_break == -1:
+            return footer
+        return footer[line_break + 1:]
+
+    def _bisect_left(self, page_number):
+        low, high = 0, self.n_pages
+        while low < high:
+            middle = (low + high) // 2
+            if self._nearest_page_number(middle) < page_number:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _nearest_page_number(self, index):
+        """
+        Returns the page number of the page at the given index or, for pages without number (e.g. blank pages),
+        the one of the closest numbered page after it, or before it at the end of the PDF.
+        """
+        for candidate in (*range(index, self.n_pages), *range(index - 1, -1, -1)):
+            try:
+                return self.page_number(candidate)
+            except ValueError:
+                continue
+        raise ValueError('Page number not found')
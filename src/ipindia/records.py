@@ -0,0 +1,64 @@
+"""
+Implements the record types of the datasets exported from the invention pages.
+"""
+
+
+class Record:
+    """
+    Base class of the records. Records keep their values in slots, without a per-record dictionary, and their
+    column names are defined once per type instead of being repeated as keys in every record.
+    """
+    __slots__ = ()
+    columns = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values, strict=True):
+            setattr(self, name, value)
+
+    def __iter__(self):
+        for name in self.__slots__:
+            yield getattr(self, name)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={value!r}' for name, value in zip(self.__slots__, self))
+        return f'{type(self).__name__}({values})'
+
+    def as_dict(self):
+        return dict(zip(self.columns, self))
+
+
+class ApplicationRecord(Record):
+    """
+    The application published in an invention page.
+    """
+    __slots__ = ('application', 'date_of_filing', 'publication_date', 'title', 'international_classification',
+                 'international_application_date', 'international_publication_number', 'patent_of_addition_number',
+                 'divisional_number', 'abstract', 'no_pages', 'no_claims')
+    columns = ('Application', 'Date of Filing', 'Publication Date', 'Title of Invention',
+               'International Classification', 'International Application Filing Date',
+               'International Publication Number', 'Patent of Addition to Application Number',
+               'Division to Application Number', 'Abstract', 'No. of Pages', 'No. of Claims')
+    # keys of InventionPage.data with the values of the slots
+    data_keys = ('Application No.', 'Date of filing of Application', 'Publication Date', 'Title of the invention',
+                 'International\nclassification', 'international_application_date', 'international_publication_no',
+                 'patent_of_addition_number', 'divisional_to_application_number', 'Abstract', 'no_pages',
+                 'no_claims')
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(*[data[key] for key in cls.data_keys])
+
+
+class PersonRecord(Record):
+    """
+    An applicant or an inventor of an application.
+    """
+    __slots__ = ('application_no', 'name', 'address', 'pincode')
+    columns = ('Application No.', 'name', 'address', 'pincode')
+
+    @classmethod
+    def from_dict(cls, person):
+        return cls(*[person[column] for column in cls.columns])
@@ -0,0 +1,186 @@
+"""
+Implements the S3Sync class, which uploads the date directories to S3, skipping the files that did not change.
+It replaces bucket.sh.
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+
+def compute_etag(path, multipart_threshold, multipart_chunksize):
+    """
+    Computes the ETag S3 gives to a file uploaded with the given multipart settings: the MD5 hash of the file for a
+    single-part upload, or the MD5 hash of the MD5 hashes of the parts followed by the number of parts.
+    """
+    size = path.stat().st_size
+    with open(path, 'rb') as file:
+        if size < multipart_threshold:
+            digest = hashlib.md5()
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+            return digest.hexdigest()
+        part_digests = [hashlib.md5(part).digest() for part in iter(lambda: file.read(multipart_chunksize), b'')]
+    return f'{hashlib.md5(b"".join(part_digests)).hexdigest()}-{len(part_digests)}'
+
+
+class S3Sync:
+    """
+    Class to upload directories to an S3 bucket, keeping their paths relative to a root directory.
+
+    A local manifest records the size, modification time and ETag of every uploaded file, so ETags are computed
+    again only for modified files. The files whose ETag matches the one of the remote object are skipped; the
+    others are uploaded concurrently, with multipart transfers for the large ones, over a shared connection pool.
+    """
+    manifest_name = '.s3_manifest.json'
+    excluded_names = {'.DS_Store', manifest_name}
+    # local caches (page text stores, parsing checkpoints) and files still being written
+    excluded_directories = {'page_text', 'checkpoints'}
+    excluded_suffixes = ('.tmp', '.part', '.partial', '.crdownload')
+
+    def __init__(self, bucket, prefix='data', root='.', max_workers=8, multipart_threshold=8 * 1024 ** 2,
+                 multipart_chunksize=8 * 1024 ** 2, client=None):
+        """
+        Parameters
+        ----------
+        bucket: str
+            The name of the bucket.
+        prefix: str, optional
+            The prefix of the keys. The default is 'data', so ./2005/2005-01-07/pdf/x.pdf is uploaded to
+            data/2005/2005-01-07/pdf/x.pdf.
+        root: str or Path, optional
+            The directory the keys are relative to. The default is the current directory.
+        max_workers: int, optional
+            The number of files uploaded at the same time. The default is 8.
+        multipart_threshold: int, optional
+            The size from which files are uploaded in parts. The default is 8 MiB, as in the AWS CLI.
+        multipart_chunksize: int, optional
+            The size of the parts. The default is 8 MiB, as in the AWS CLI.
+        client: optional
+            The S3 client. The default is a new client with a connection pool large enough for all the transfers.
+        """
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.root = Path(root)
+        self.max_workers = max_workers
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self.transfer_config = TransferConfig(multipart_threshold=multipart_threshold,
+                                              multipart_chunksize=multipart_chunksize, max_concurrency=4)
+        if client is None:
+            client = boto3.client('s3', config=Config(max_pool_connections=max_workers * 4,
+                                                      retries={'max_attempts': 10, 'mode': 'adaptive'}))
+        self.client = client
+        self.manifest_path = self.root / self.manifest_name
+        self.manifest = self._load_manifest()
+        self._lock = threading.Lock()
+
+    def sync_directory(self, directory):
+        """
+        Main method. Uploads the files of a directory (recursively) that are missing or different in the bucket.
+
+        Returns
+        -------
+        dict
+            The number of files uploaded and skipped.
+        """
+        directory = Path(directory)
+        files = [path for path in sorted(directory.rglob('*')) if path.is_file() and not self.is_excluded(path)]
+        remote_etags = self.list_etags(self.key(directory) + '/')
+        to_upload = []
+        for path in files:
+            key = self.key(path)
+            if remote_etags.get(key) in self._local_etags(path):
+                continue
+            to_upload.append((path, key))
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(lambda item: self.upload_file(*item), to_upload))
+        finally:
+            # the files uploaded before an error are not uploaded again
+            self._save_manifest()
+        result = {'uploaded': len(to_upload), 'skipped': len(files) - len(to_upload)}
+        print(f'{directory}: {result["uploaded"]} files uploaded, {result["skipped"]} unchanged')
+        return result
+
+    def sync_directories(self, directories):
+        return {str(directory): self.sync_directory(directory) for directory in directories}
+
+    def upload_file(self, path, key):
+        self.client.upload_file(str(path), self.bucket, key, Config=self.transfer_config)
+        etag = self.client.head_object(Bucket=self.bucket, Key=key)['ETag'].strip('"')
+        self._record(path, etag)
+
+    def list_etags(self, key_prefix):
+        """
+        Returns the ETags of the objects under the given prefix, by key, with a single paginated listing.
+        """
+        etags = {}
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=key_prefix):
+            for item in page.get('Contents', []):
+                etags[item['Key']] = item['ETag'].strip('"')
+        return etags
+
+    def is_excluded(self, path):
+        """
+        Checks whether a file is left out of the uploads: system files, the manifest, the files of the local caches
+        and the temporary and partial files.
+        """
+        relative_parts = Path(os.path.relpath(path, self.root)).parts
+        return (path.name in self.excluded_names or path.name.endswith(self.excluded_suffixes)
+                or any(part in self.excluded_directories for part in relative_parts[:-1]))
+
+    def key(self, path):
+        relative_path = Path(os.path.relpath(path, self.root)).as_posix()
+        return f'{self.prefix}/{relative_path}' if self.prefix else relative_path
+
+    # ------------------------------
+    # Manifest
+    # ------------------------------
+
+    def _local_etags(self, path):
+        """
+        The ETags the remote object may have if the file did not change: the one computed with the current
+        multipart settings and the one returned when the file was last uploaded, which differs if it was
+        uploaded with other settings.
+        """
+        stat = path.stat()
+        entry = self.manifest.get(self.key(path))
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'uploaded_etag': None}
+        if entry.get('etag') is None:
+            entry['etag'] = compute_etag(path, self.multipart_threshold, self.multipart_chunksize)
+        with self._lock:
+            self.manifest[self.key(path)] = entry
+        return {entry['etag'], entry['uploaded_etag']} - {None}
+
+    def _record(self, path, etag):
+        stat = path.stat()
+        with self._lock:
+            entry = self.manifest.get(self.key(path), {})
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, uploaded_etag=etag)
+            self.manifest[self.key(path)] = entry
+
+    def _load_manifest(self):
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, encoding='utf-8') as file:
+            return json.load(file)
+
+    def _save_manifest(self):
+        temporary_path = self.manifest_path.with_name(f'{self.manifest_name}.tmp')
+        with self._lock, open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(self.manifest, file, indent=1)
+        os.replace(temporary_path, self.manifest_path)
+
+
+if __name__ == '__main__':
+    s3_sync = S3Sync('test-pjds-data')
+    s3_sync.sync_directories(sorted(path for path in Path('2005').iterdir() if path.is_dir()))
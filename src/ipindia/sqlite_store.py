@@ -0,0 +1,337 @@
+"""
+Implements the SQLiteStore class, an indexed SQLite database used as output backend of DateProcessor.
+"""
+import json
+import sqlite3
+
+from ipindia.writers import as_integer, parse_date
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    application_no TEXT NOT NULL,
+    journal_date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    date_of_filing TEXT,
+    publication_date TEXT,
+    title TEXT,
+    international_classification TEXT,
+    international_application_filing_date TEXT,
+    international_publication_number TEXT,
+    patent_of_addition_number TEXT,
+    divisional_number TEXT,
+    abstract TEXT,
+    no_pages INTEGER,
+    no_claims INTEGER,
+    PRIMARY KEY (journal_date, category, application_no)
+);
+CREATE INDEX IF NOT EXISTS applications_application_no ON applications (application_no);
+CREATE INDEX IF NOT EXISTS applications_publication_date ON applications (publication_date);
+CREATE INDEX IF NOT EXISTS applications_date_of_filing ON applications (date_of_filing);
+
+CREATE TABLE IF NOT EXISTS applicants (
+    application_no TEXT NOT NULL,
+    journal_date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    address TEXT,
+    pincode TEXT,
+    PRIMARY KEY (journal_date, category, application_no, position)
+);
+CREATE INDEX IF NOT EXISTS applicants_application_no ON applicants (application_no);
+CREATE INDEX IF NOT EXISTS applicants_journal_date ON applicants (journal_date);
+
+CREATE TABLE IF NOT EXISTS inventors (
+    application_no TEXT NOT NULL,
+    journal_date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    address TEXT,
+    pincode TEXT,
+    PRIMARY KEY (journal_date, category, application_no, position)
+);
+CREATE INDEX IF NOT EXISTS inventors_application_no ON inventors (application_no);
+CREATE INDEX IF NOT EXISTS inventors_journal_date ON inventors (journal_date);
+
+CREATE TABLE IF NOT EXISTS fer (
+    journal_date TEXT NOT NULL,
+    serial_number INTEGER NOT NULL,
+    application_no TEXT,
+    date_of_filing TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (journal_date, serial_number)
+);
+CREATE INDEX IF NOT EXISTS fer_application_no ON fer (application_no);
+CREATE INDEX IF NOT EXISTS fer_date_of_filing ON fer (date_of_filing);
+
+CREATE TABLE IF NOT EXISTS grants (
+    journal_date TEXT NOT NULL,
+    serial_number INTEGER NOT NULL,
+    application_no TEXT,
+    date_of_filing TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (journal_date, serial_number)
+);
+CREATE INDEX IF NOT EXISTS grants_application_no ON grants (application_no);
+CREATE INDEX IF NOT EXISTS grants_date_of_filing ON grants (date_of_filing);
+"""
+
+
+def iso_date(text):
+    """
+    Converts a DD/MM/YYYY date, as printed in the journals, to YYYY-MM-DD, so that dates sort and compare as text.
+    """
+    date = parse_date(text)
+    return None if date is None else date.isoformat()
+
+
+def as_text(value):
+    if value is None or value == 'NA':
+        return None
+    return str(value)
+
+
+class SQLiteStore:
+    """
+    Class to store the datasets of the journals in a SQLite database, indexed on application number, publication
+    date and filing date. Each date is written in one transaction, and the rows are upserted, so reprocessing a
+    date replaces its previous rows instead of duplicating them.
+    The rows of a date are kept in memory as they are added, and only written by write_pending, so the write lock of
+    the database is held while inserting them and not while the journal is parsed.
+    """
+    people_tables = ('applicants', 'inventors')
+    table_datasets = ('fer', 'grants')
+    table_categories = {'fer': 'WEEKLY ISSUED FER', 'grants': 'PUBLICATION UNDER SECTION 43(2) IN RESPECT OF THE GRANT'}
+    dataset_tables = {'applications': 'applications', 'applicant_names': 'applicants',
+                      'inventor_names': 'inventors', 'fer': 'fer', 'grants': 'grants'}
+
+    def __init__(self, path, timeout=60):
+        """
+        Parameters
+        ----------
+        path: str or Path
+            The database file. It is created, with its tables and indices, if it does not exist.
+        timeout: int, optional
+            The seconds to wait for the lock of the database, held by other processes. The default is 60.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.pending = []
+        self._pending_keys = {}
+
+    def begin(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+
+    def commit(self):
+        self.connection.execute('COMMIT')
+
+    def rollback(self):
+        self.connection.execute('ROLLBACK')
+
+    def close(self):
+        self.connection.close()
+
+    def clear(self, journal_date, categories):
+        """
+        Deletes the rows written for the given categories of a date, before writing them again.
+        """
+        categories = list(categories)
+        placeholders = ', '.join('?' * len(categories))
+        for table in ('applications', *self.people_tables):
+            self.connection.execute(
+                f'DELETE FROM {table} WHERE journal_date = ? AND category IN ({placeholders})',
+                (journal_date, *categories))
+        for table, category in self.table_categories.items():
+            if category in categories:
+                self.connection.execute(f'DELETE FROM {table} WHERE journal_date = ?', (journal_date,))
+
+    def add(self, dataset, journal_date, category, columns, records, positions=None):
+        """
+        Builds the rows of a batch of records of a dataset and keeps them until write_pending.
+        Rows with an empty key column (e.g. the records of an invention page without application number) are
+        skipped, and keys repeated within the date are reported, since only the last row of each key is kept.
+
+        Parameters
+        ----------
+        dataset: str
+            'applications', 'applicant_names', 'inventor_names', 'fer' or 'grants'.
+        journal_date: str
+            The date of the journal, formatted as YYYY-MM-DD.
+        category: str
+            The category of the journal the records come from.
+        columns: sequence of str
+            The column names of the records.
+        records: iterable
+            The records, as sequences of values in the order of the columns.
+        positions: dict, optional
+            The number of people already written per application, for the people datasets. It is updated.
+
+        Returns
+        -------
+        int
+            The number of rows kept.
+        """
+        table = self.dataset_tables[dataset]
+        if table == 'applications':
+            rows = [self._application_row(journal_date, category, record) for record in records]
+        elif table in self.people_tables:
+            rows = [self._person_row(journal_date, category, record, positions) for record in records]
+        else:
+            rows = [self._table_row(journal_date, columns, record) for record in records]
+        key_columns = self._key_columns(table)
+        key_indices = [self._table_columns(table).index(column) for column in key_columns]
+        pending_keys = self._pending_keys.setdefault(table, set())
+        kept_rows = []
+        empty_columns = set()
+        for row in rows:
+            key = tuple(row[i] for i in key_indices)
+            if None in key:
+                empty_columns.update(column for column, value in zip(key_columns, key) if value is None)
+                continue
+            if key in pending_keys:
+                print(f'Duplicate {table} row {dict(zip(key_columns, key))}: it replaces the previous one')
+            pending_keys.add(key)
+            kept_rows.append(row)
+        if empty_columns:
+            print(f'Skipped {len(rows) - len(kept_rows)} {table} rows of {category} without '
+                  f'{" or ".join(sorted(empty_columns))}')
+        if kept_rows:
+            self.pending.append((table, kept_rows))
+        return len(kept_rows)
+
+    def write_pending(self, journal_date, categories):
+        """
+        Writes the rows added since the last write in one transaction, after deleting the rows written for the given
+        categories of the date by a previous run. The transaction is rolled back if some write fails.
+
+        Returns
+        -------
+        int
+            The number of rows written.
+        """
+        n_rows = sum(len(rows) for _, rows in self.pending)
+        self.begin()
+        try:
+            self.clear(journal_date, categories)
+            for table, rows in self.pending:
+                self._upsert_rows(table, rows)
+        except BaseException:
+            self.rollback()
+            raise
+        else:
+            self.commit()
+        finally:
+            self.discard_pending()
+        return n_rows
+
+    def discard_pending(self):
+        self.pending = []
+        self._pending_keys = {}
+
+    def find_application(self, application_no):
+        """
+        Returns everything stored about an application, as a dictionary of lists of rows per table.
+        """
+        self.connection.row_factory = sqlite3.Row
+        try:
+            return {table: [dict(row) for row in self.connection.execute(
+                        f'SELECT * FROM {table} WHERE application_no = ?', (application_no,))]
+                    for table in ('applications', *self.people_tables, *self.table_datasets)}
+        finally:
+            self.connection.row_factory = None
+
+    # ------------------------------
+    # Rows
+    # ------------------------------
+
+    def _upsert_rows(self, table, rows):
+        """
+        Inserts or replaces rows of a table with a single executemany.
+        """
+        placeholders = ', '.join('?' * len(rows[0]))
+        column_names = self._table_columns(table)
+        key_columns = self._key_columns(table)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in column_names if column not in key_columns)
+        self.connection.executemany(
+            f'INSERT INTO {table} ({", ".join(column_names)}) VALUES ({placeholders}) '
+            f'ON CONFLICT ({", ".join(key_columns)}) DO UPDATE SET {updates}',
+            rows)
+
+    @staticmethod
+    def _application_row(journal_date, category, record):
+        (application, date_of_filing, publication_date, title, classification, international_date,
+         international_publication, patent_of_addition, divisional, abstract, no_pages, no_claims) = record
+        return (as_text(application), journal_date, category, iso_date(date_of_filing), iso_date(publication_date),
+                as_text(title), as_text(classification), iso_date(international_date),
+                as_text(international_publication), as_text(patent_of_addition), as_text(divisional),
+                as_text(abstract), as_integer(no_pages), as_integer(no_claims))
+
+    @staticmethod
+    def _person_row(journal_date, category, record, positions):
+        application_no, name, address, pincode = record
+        application_no = as_text(application_no)
+        position = positions.get(application_no, 0)
+        positions[application_no] = position + 1
+        return application_no, journal_date, category, position, as_text(name), as_text(address), as_text(pincode)
+
+    @staticmethod
+    def _table_row(journal_date, columns, record):
+        data = dict(zip(columns, (None if value is None else str(value) for value in record)))
+        application_column = next((column for column in columns if 'application' in column.lower()), None)
+        filing_column = next((column for column in columns if 'filing' in column.lower()), None)
+        application_no = data.get(application_column) if application_column else None
+        date_of_filing = iso_date(data.get(filing_column)) if filing_column else None
+        return (journal_date, as_integer(record[0]), as_text(application_no), date_of_filing,
+                json.dumps(data, ensure_ascii=False))
+
+    def _table_columns(self, table):
+        return [row[1] for row in self.connection.execute(f'PRAGMA table_info({table})')]
+
+    def _key_columns(self, table):
+        key_rows = sorted((row[5], row[1]) for row in self.connection.execute(f'PRAGMA table_info({table})') if row[5])
+        return [name for _, name in key_rows]
+
+
+class SQLiteBatchWriter:
+    """
+    Class to add the records of a dataset of a date to a SQLiteStore in batches, with the interface of
+    CsvBatchWriter. The store writes them with the rest of the date in write_pending, and rows with the key of an
+    existing row replace it.
+    """
+
+    def __init__(self, store, dataset, journal_date, category, columns, batch_size=None):
+        self.store = store
+        self.dataset = dataset
+        self.journal_date = journal_date
+        self.category = category
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.buffer = []
+        self.positions = {}
+        self.n_records = 0
+
+    def write_many(self, records):
+        self.buffer.extend(records)
+        if self.batch_size is not None and len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.n_records += self.store.add(self.dataset, self.journal_date, self.category, self.columns, self.buffer,
+                                         self.positions)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        print(f'Prepared {self.n_records} {self.dataset} records for {self.store.path}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
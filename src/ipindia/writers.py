@@ -0,0 +1,194 @@
+"""
+Implements the writers used to export the datasets in bounded batches.
+"""
+import os
+import re
+from datetime import datetime
+
+import pandas as pd
+
+
+class CsvBatchWriter:
+    """
+    Class to write records to a CSV file in batches, so that they do not need to be held in memory all at once.
+    The records are appended to a partial file, which is moved to its destination when the writer is closed.
+    If the destination already exists, the writer discards the records and leaves the file untouched.
+    """
+
+    def __init__(self, destination_path, columns, batch_size=None):
+        """
+        Parameters
+        ----------
+        destination_path: Path
+            The CSV file to write.
+        columns: sequence of str
+            The column names, in the order of the values of the records.
+        batch_size: int, optional
+            The number of records buffered before they are written. If None, they are written when closing.
+        """
+        self.destination_path = destination_path
+        self.partial_path = destination_path.with_name(f'{destination_path.name}.partial')
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.buffer = []
+        self.n_records = 0
+        self.skip = destination_path.exists()
+        if self.skip:
+            print(f'{destination_path} already exists')
+        elif self.partial_path.exists():
+            self.partial_path.unlink()
+
+    def write_many(self, records):
+        if self.skip:
+            return
+        self.buffer.extend(records)
+        if self.batch_size is not None and len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.skip or not self.buffer:
+            return
+        df = pd.DataFrame.from_records([tuple(record) for record in self.buffer], columns=self.columns)
+        df.replace('NA', '', inplace=True)
+        df.to_csv(self.partial_path, mode='a', header=self.n_records == 0, index=False)
+        self.n_records += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        if self.skip:
+            return
+        self.flush()
+        if self.n_records == 0:
+            pd.DataFrame(columns=self.columns).to_csv(self.partial_path, index=False)
+        os.replace(self.partial_path, self.destination_path)
+        print(f'Successful export {self.destination_path}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+class ParquetBatchWriter(CsvBatchWriter):
+    """
+    Class to write records to a Parquet file in batches, each batch being a row group.
+    The serial numbers and the numbers of pages and claims are stored as 32-bit integers, the columns with the word
+    date in their name as dates, and the other columns as strings, like in the CSV files. The values that cannot be
+    converted are stored as nulls. The columns are compressed and, for the given ones, dictionary encoded.
+    It requires pyarrow.
+    """
+    integer_columns = ('Sr. No.', 'Serial Number', 'No. of Pages', 'No. of Claims')
+
+    def __init__(self, destination_path, columns, batch_size=None, dictionary_columns=(), compression='zstd'):
+        """
+        Parameters
+        ----------
+        destination_path: Path
+            The Parquet file to write.
+        columns: sequence of str
+            The column names, in the order of the values of the records.
+        batch_size: int, optional
+            The number of records buffered before they are written. If None, they are written when closing.
+        dictionary_columns: sequence of str, optional
+            The columns with many repeated values, which are dictionary encoded.
+        compression: str, optional
+            The compression codec. The default is 'zstd'.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        super().__init__(destination_path, columns, batch_size)
+        self.schema = pa.schema([(column, self._column_type(column)) for column in self.columns])
+        self.converters = [self._converter(field.type) for field in self.schema]
+        self.dictionary_columns = [column for column in dictionary_columns if column in self.columns]
+        self.compression = compression
+        self.parquet_writer = None
+
+    def flush(self):
+        if self.skip or not self.buffer:
+            return
+        table = self.pa.Table.from_pylist([self._as_row(record) for record in self.buffer], schema=self.schema)
+        self._get_parquet_writer().write_table(table)
+        self.n_records += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        if self.skip:
+            return
+        self.flush()
+        self._get_parquet_writer().close()
+        os.replace(self.partial_path, self.destination_path)
+        print(f'Successful export {self.destination_path}')
+
+    def _get_parquet_writer(self):
+        if self.parquet_writer is None:
+            self.destination_path.parent.mkdir(parents=True, exist_ok=True)
+            self.parquet_writer = self.pq.ParquetWriter(self.partial_path, self.schema,
+                                                        compression=self.compression,
+                                                        use_dictionary=self.dictionary_columns)
+        return self.parquet_writer
+
+    def _column_type(self, column):
+        if column in self.integer_columns:
+            return self.pa.int32()
+        if re.search(r'\bdate\b', column, re.IGNORECASE):
+            return self.pa.date32()
+        return self.pa.string()
+
+    def _converter(self, column_type):
+        if column_type == self.pa.int32():
+            return as_integer
+        if column_type == self.pa.date32():
+            return parse_date
+        return self._as_string
+
+    def _as_row(self, record):
+        return {column: convert(value) for column, convert, value in zip(self.columns, self.converters, record)}
+
+    @staticmethod
+    def _as_string(value):
+        if value is None:
+            return None
+        value = str(value)
+        return '' if value == 'NA' else value
+
+
+def parse_date(text):
+    """
+    Returns the first DD/MM/YYYY date of a text, as printed in the journals, or None if it has no valid date.
+    """
+    if text is None:
+        return None
+    match = re.search(r'\d{2}/\d{2}/\d{4}', str(text))
+    if match is None:
+        return None
+    try:
+        return datetime.strptime(match.group(0), '%d/%m/%Y').date()
+    except ValueError:
+        return None
+
+
+def as_integer(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def category_slug(category):
+    """
+    Returns the name of a category in lowercase, with underscores instead of spaces and symbols.
+    """
+    return re.sub(r'[^a-z0-9]+', '_', category.lower()).strip('_')
+
+
+def partition_path(root, dataset, publication_date, category, file_name='part-0.parquet'):
+    """
+    Returns the path of a file of a Parquet dataset partitioned by year, publication date and category.
+    """
+    return (root / dataset / f'year={publication_date[:4]}' / f'publication_date={publication_date}'
+            / f'category={category_slug(category)}' / file_name)